@@ -1,15 +1,36 @@
+from heapq import heappush, heappop
+from itertools import count
+from heuristic import UNREACHABLE
+
+
 class AStar:
     """
     Define the A-star class for low-level shortest path computation
     """
+    # Tie-breaking rules among open states sharing the same f-score
+    LARGER_G = 'larger_g'
+    FEWEST_CONFLICTS = 'fewest_conflicts'
 
     def __init__(
             self,
-            env) -> None:
+            env,
+            tie_breaking: str = LARGER_G,
+            max_expansions: int = None) -> None:
         self.agent_dict = env.agent_dict
         self.admissible_heuristic = env.admissible_heuristic
         self.is_at_goal = env.is_at_goal
         self.get_neighbors = env.get_neighbors
+        self.count_conflicts = env.count_conflicts
+        self.get_time_horizon = env.get_time_horizon
+        self.get_latest_constraint_time = env.get_latest_constraint_time
+
+        if tie_breaking not in (AStar.LARGER_G, AStar.FEWEST_CONFLICTS):
+            raise ValueError("Unknown tie-breaking rule: " + str(tie_breaking))
+        self.tie_breaking = tie_breaking
+        # Budget of expansions for a single search, None for no limit
+        self.max_expansions = max_expansions
+        # Total number of states expanded over all searches
+        self.num_expansions = 0
 
     @staticmethod
     def reconstruct_path(
@@ -24,13 +45,32 @@ class AStar:
     def search(self, agent_name):
         """
         low level search
+
+        States carry their time, so waiting creates new states. Once every
+        constraint has expired, a cell is expanded at most once whatever the
+        time. The search does not generate states beyond the environment's
+        time horizon and gives up after max_expansions expansions, so it
+        always terminates, returning False if no path is found.
         """
         initial_state = self.agent_dict[agent_name]["start"]
         step_cost = 1
+        time_horizon = self.get_time_horizon()
+        static_time = self.get_latest_constraint_time()
+        expansions_left = self.max_expansions
+        use_conflicts = self.tie_breaking == AStar.FEWEST_CONFLICTS
 
         closed_set = set()
-        # Open_set is the set of nodes that need to be expanded / re-expanded
-        open_set = {initial_state}
+        # Cells expanded after static_time, where a state's time no longer
+        # matters: the first state expanded on such a cell has the smallest
+        # g-score, any later one is redundant
+        static_closed_set = set()
+        # The open list is a binary heap of (f, [conflicts,] -g, tie, state)
+        # entries. A state can be pushed more than once when a cheaper path to
+        # it is found; stale entries are skipped when popped (lazy deletion).
+        # The tie counter keeps the ordering deterministic and avoids ever
+        # comparing two states.
+        open_heap = []
+        tie = count()
 
         # came_from is the node/state that immediately precedes the current
         # node/state on the shortest path from the start to the currently known
@@ -41,43 +81,72 @@ class AStar:
         # current node/state
         g_score = {initial_state: 0}
 
-        # For node n, fScore[n] := gScore[n] + h(n), where h(n) represents
-        # the admissible heuristic. It is our best guess of the cost of the
-        # path if it goes through n
-        f_score = {initial_state: self.admissible_heuristic(initial_state,
-                                                            agent_name)}
+        # Number of conflicts with the other agents' paths accumulated along
+        # the best known path to a state, only tracked for FEWEST_CONFLICTS
+        conflict_score = {initial_state: 0}
 
-        while open_set:
-            # Initialize the temp dict
-            temp_dict = {
-                open_item: f_score.setdefault(open_item, float("inf")) for
-                open_item in open_set}
-            current = min(temp_dict, key=temp_dict.get)
+        # f = g + h, where h represents the admissible heuristic. It is our
+        # best guess of the cost of the path if it goes through the state
+        f = self.admissible_heuristic(initial_state, agent_name)
+        if f == UNREACHABLE:
+            return False
+        if use_conflicts:
+            heappush(open_heap, (f, 0, 0, next(tie), initial_state))
+        else:
+            heappush(open_heap, (f, 0, next(tie), initial_state))
+
+        while open_heap:
+            entry = heappop(open_heap)
+            current = entry[-1]
+            if current in closed_set or -entry[-3] > g_score[current] or \
+                    (use_conflicts and entry[1] > conflict_score[current]):
+                continue
+            if current.time > static_time:
+                if current.position in static_closed_set:
+                    continue
+                static_closed_set.add(current.position)
 
             if self.is_at_goal(current, agent_name):
                 return self.reconstruct_path(came_from, current)
 
-            open_set -= {current}
-            closed_set |= {current}
+            if expansions_left is not None:
+                if expansions_left == 0:
+                    return False
+                expansions_left -= 1
+            closed_set.add(current)
+            self.num_expansions += 1
 
-            neighbor_list = self.get_neighbors(current)
+            if current.time >= time_horizon:
+                continue
+            tentative_g_score = g_score[current] + step_cost
 
-            for neighbor in neighbor_list:
-                if neighbor in closed_set:
+            for neighbor in self.get_neighbors(current):
+                if neighbor in closed_set or (
+                        neighbor.time > static_time and
+                        neighbor.position in static_closed_set):
                     continue
 
-                tentative_g_score = g_score.setdefault(current, float(
-                    "inf")) + step_cost
-
-                if neighbor not in open_set:
-                    open_set |= {neighbor}
-                elif tentative_g_score >= g_score.setdefault(neighbor,
-                                                             float("inf")):
+                neighbor_g_score = g_score.get(neighbor, float("inf"))
+                if use_conflicts:
+                    conflicts = conflict_score[current] + \
+                        self.count_conflicts(current, neighbor)
+                    # Among equally short paths keep the least conflicting one
+                    if tentative_g_score > neighbor_g_score or (
+                            tentative_g_score == neighbor_g_score and
+                            conflicts >= conflict_score[neighbor]):
+                        continue
+                    conflict_score[neighbor] = conflicts
+                elif tentative_g_score >= neighbor_g_score:
                     continue
 
                 came_from[neighbor] = current
                 g_score[neighbor] = tentative_g_score
-                f_score[neighbor] = g_score[
-                                        neighbor] + self.admissible_heuristic(
+                f = tentative_g_score + self.admissible_heuristic(
                     neighbor, agent_name)
-        return False
\ No newline at end of file
+                if use_conflicts:
+                    heappush(open_heap, (f, conflicts, -tentative_g_score,
+                                         next(tie), neighbor))
+                else:
+                    heappush(open_heap, (f, -tentative_g_score, next(tie),
+                                         neighbor))
+        return False
@@ -0,0 +1,48 @@
+from __future__ import annotations
+from cbs import CBS
+from prioritized_planning import PrioritizedPlanning
+from search_result import SearchResult
+
+
+class AutoSolver:
+    """
+    Tries CBS under a budget and falls back to prioritized planning when
+    CBS runs out of it, trading optimality for an answer on instances with
+    too many agents for CBS.
+    """
+    def __init__(
+            self,
+            environment,
+            cbs_time_limit: float = 1.0,
+            cbs_node_limit: int = None,
+            max_restarts: int = 10,
+            seed: int = 0) -> None:
+        """
+        :param environment: The Environment to plan in
+        :param cbs_time_limit: Seconds given to CBS, None for no limit
+        :param cbs_node_limit: Nodes CBS may expand, None for no limit
+        :param max_restarts: See PrioritizedPlanning
+        :param seed: See PrioritizedPlanning
+        """
+        self.env = environment
+        self.cbs = CBS(environment, time_limit=cbs_time_limit,
+                       node_limit=cbs_node_limit)
+        self.prioritized_planning = PrioritizedPlanning(
+            environment, max_restarts=max_restarts, seed=seed)
+        # The solver whose plan was returned by the last search
+        self.solver = None
+        self.result = None
+
+    def search(self) -> dict:
+        """
+        :returns: The plan, see CBS.generate_plan, {} if none was found. It
+                    is optimal if solver is the CBS instance.
+        """
+        self.solver = self.cbs
+        plan = self.cbs.search()
+        if self.cbs.result.status in (SearchResult.TIMEOUT,
+                                      SearchResult.NODE_LIMIT):
+            self.solver = self.prioritized_planning
+            plan = self.prioritized_planning.search()
+        self.result = self.solver.result
+        return plan
@@ -0,0 +1,302 @@
+# Batch solver for many independent MAPF instances. The instances are solved
+# in parallel worker processes and one JSON line is written per instance as
+# soon as it is solved, in the order the instances finish.
+#
+# An instance is a JSON object in the format of the env_dict of main.py,
+# {"dimensions": [rows, columns], "obstacles": [[x, y], ...],
+#  "agents": [{"name": ..., "start": [x, y], "goal": [x, y]}, ...]},
+# optionally with a "name". Instances are read from the *.json files of a
+# directory, from a JSON lines file, or from JSON lines on stdin ("-").
+#
+# Usage:
+#   python batch_solver.py instances/ [--workers 4] [--time-limit 10]
+#                          [--memory-limit 2048] [--solver cbs]
+#   cat instances.jsonl | python batch_solver.py - > results.jsonl
+
+import argparse
+import json
+import os
+import signal
+import sys
+from collections import deque
+from concurrent.futures import ALL_COMPLETED, FIRST_COMPLETED, \
+    ProcessPoolExecutor, wait
+from concurrent.futures.process import BrokenProcessPool
+
+from auto_solver import AutoSolver
+from cbs import CBS
+from ecbs import ECBS
+from environment import Environment
+from prioritized_planning import PrioritizedPlanning
+from search_result import SearchResult
+from search_stats import SearchStats
+from vectorized_plans import validate_plan
+
+SOLVERS = ('cbs', 'ecbs', 'prioritized', 'auto')
+
+# Statuses of the instances that ended without a SearchResult
+OUT_OF_MEMORY = 'out_of_memory'
+ERROR = 'error'
+
+# Seconds a worker may overrun the time limit before the instance is
+# interrupted, e.g. within a long low-level search, where the solvers don't
+# check their time limit
+HARD_TIMEOUT_GRACE = 1.0
+
+
+def read_instances(
+        source: str):
+    """
+    Lazily reads instances
+
+    :param source: A directory of *.json files, a JSON lines file, or "-"
+                    for JSON lines on stdin
+    :returns: An iterator over (name, env_dict) pairs
+    """
+    if os.path.isdir(source):
+        for file_name in sorted(os.listdir(source)):
+            if file_name.endswith('.json'):
+                with open(os.path.join(source, file_name)) as file:
+                    env_dict = json.load(file)
+                yield env_dict.get('name', file_name[:-len('.json')]), env_dict
+        return
+    lines = sys.stdin if source == '-' else open(source)
+    try:
+        for line_number, line in enumerate(lines):
+            if line.strip():
+                env_dict = json.loads(line)
+                yield env_dict.get('name', line_number), env_dict
+    finally:
+        if lines is not sys.stdin:
+            lines.close()
+
+
+def make_solver(
+        environment: Environment,
+        solver: str,
+        time_limit: float,
+        suboptimality: float,
+        stats: SearchStats = None):
+    """
+    Creates one of SOLVERS on an environment
+
+    :param stats: Passed to CBS and ECBS, ignored by the other solvers
+    """
+    if solver == 'cbs':
+        return CBS(environment, time_limit=time_limit, stats=stats)
+    if solver == 'ecbs':
+        return ECBS(environment, suboptimality, time_limit=time_limit,
+                    stats=stats)
+    if solver == 'prioritized':
+        return PrioritizedPlanning(environment, time_limit=time_limit)
+    if solver == 'auto':
+        # Half of the time for CBS, the rest is left to the fallback
+        return AutoSolver(environment, cbs_time_limit=time_limit / 2
+                          if time_limit is not None else 1.0)
+    raise ValueError("Unknown solver: " + str(solver))
+
+
+def _initialize_worker(
+        memory_limit: int) -> None:
+    if memory_limit is not None:
+        import resource
+        _, hard_limit = resource.getrlimit(resource.RLIMIT_AS)
+        resource.setrlimit(resource.RLIMIT_AS,
+                           (memory_limit * 2 ** 20, hard_limit))
+
+
+def _interrupt(signal_number, frame):
+    raise TimeoutError()
+
+
+def solve_instance(
+        name,
+        env_dict: dict,
+        solver: str = 'cbs',
+        time_limit: float = None,
+        suboptimality: float = 1.5,
+        include_plan: bool = True,
+        include_stats: bool = False,
+        validate: bool = False) -> dict:
+    """
+    Solves one instance. Within a worker process the grid tables and
+    distance maps are cached, so instances on a map already seen by the
+    worker skip their computation.
+
+    :param name: Name of the instance, copied to the result
+    :param env_dict: The instance
+    :param solver: One of SOLVERS
+    :param time_limit: Seconds given to the solver, None for no limit
+    :param suboptimality: Suboptimality factor of ECBS
+    :param include_plan: Add the plan to the result
+    :param include_stats: Add the SearchStats of CBS and ECBS to the result
+    :param validate: Check a solution with vectorized_plans.validate_plan,
+                        adding whether it is valid and its first violations
+    :returns: A dict with the name, the fields of the solver's SearchResult
+                and the plan, or the name, status and error message
+    """
+    hard_timeout = time_limit is not None and hasattr(signal, 'SIGALRM')
+    if hard_timeout:
+        signal.signal(signal.SIGALRM, _interrupt)
+        signal.setitimer(signal.ITIMER_REAL, time_limit + HARD_TIMEOUT_GRACE)
+    try:
+        instance_solver = make_solver(
+            Environment(env_dict), solver, time_limit, suboptimality,
+            SearchStats() if include_stats else None)
+        instance_solver.search()
+        result = instance_solver.result
+    except TimeoutError:
+        return {'name': name, 'status': SearchResult.TIMEOUT,
+                'error': 'interrupted after the time limit'}
+    except MemoryError:
+        return {'name': name, 'status': OUT_OF_MEMORY,
+                'error': 'memory limit exceeded'}
+    finally:
+        if hard_timeout:
+            signal.setitimer(signal.ITIMER_REAL, 0)
+
+    output = {'name': name, 'status': result.status, 'cost': result.cost,
+              'lower_bound': result.lower_bound,
+              'num_conflicts': result.num_conflicts,
+              'num_expanded': result.num_expanded,
+              'num_generated': result.num_generated,
+              'seconds': result.elapsed}
+    if include_plan:
+        output['plan'] = result.plan
+    if result.stats is not None:
+        output['stats'] = result.stats.to_dict()
+    if validate and result.solved:
+        violations = validate_plan(result.plan, env_dict)
+        output['valid'] = not violations
+        output['violations'] = violations[:10]
+    return output
+
+
+def solve_instances(
+        instances,
+        num_workers: int = None,
+        time_limit: float = None,
+        memory_limit: int = None,
+        solver: str = 'cbs',
+        suboptimality: float = 1.5,
+        include_plan: bool = True,
+        include_stats: bool = False,
+        validate: bool = False):
+    """
+    Solves instances in parallel worker processes. Instances are read from
+    the iterator only as workers become free, so it may be an endless
+    stream.
+
+    A worker killed while solving, e.g. by the memory limit outside of a
+    Python allocation, breaks the pool and fails every instance submitted to
+    it. The pool is then rebuilt and these instances are solved again one at
+    a time, so only an instance that kills its worker on its own is
+    reported, as out of memory with a memory limit and as an error without.
+
+    :param instances: An iterable of (name, env_dict) pairs
+    :param num_workers: Number of worker processes, None for one per CPU
+    :param time_limit: Seconds given to each instance, None for no limit
+    :param memory_limit: Address space limit of each worker in MiB, None
+                            for no limit
+    :param solver: See solve_instance
+    :param suboptimality: See solve_instance
+    :param include_plan: See solve_instance
+    :param include_stats: See solve_instance
+    :param validate: See solve_instance
+    :returns: An iterator over the results of solve_instance, in the order
+                the instances finish
+    """
+    num_workers = num_workers or os.cpu_count() or 1
+    instances = iter(instances)
+    exhausted = False
+    # Instances failed by a broken pool, solved again one at a time
+    suspects = deque()
+    while suspects or not exhausted:
+        executor = ProcessPoolExecutor(num_workers,
+                                       initializer=_initialize_worker,
+                                       initargs=(memory_limit,))
+        # (name, env_dict) of the instances submitted, keyed by future
+        pending = {}
+        broken = False
+        try:
+            while pending or not broken and (suspects or not exhausted):
+                to_submit = []
+                if suspects and not broken:
+                    # A suspect is only submitted to an idle pool
+                    to_submit.append(suspects.popleft())
+                elif not broken:
+                    # Two instances per worker keep the workers busy while
+                    # results are written
+                    while not exhausted and \
+                            len(pending) + len(to_submit) < 2 * num_workers:
+                        try:
+                            to_submit.append(next(instances))
+                        except StopIteration:
+                            exhausted = True
+                for index, (name, env_dict) in enumerate(to_submit):
+                    try:
+                        future = executor.submit(
+                            solve_instance, name, env_dict, solver,
+                            time_limit, suboptimality, include_plan,
+                            include_stats, validate)
+                    except BrokenProcessPool:
+                        # These instances never ran
+                        suspects.extendleft(reversed(to_submit[index:]))
+                        broken = True
+                        break
+                    pending[future] = name, env_dict
+                if not pending:
+                    continue
+
+                alone = len(pending) == 1
+                # The futures of a broken pool all fail at once
+                done, _ = wait(pending, return_when=ALL_COMPLETED if broken
+                               else FIRST_COMPLETED)
+                for future in done:
+                    name, env_dict = pending.pop(future)
+                    try:
+                        result = future.result()
+                    except BrokenProcessPool:
+                        broken = True
+                        if not alone:
+                            suspects.append((name, env_dict))
+                            continue
+                        result = {'name': name,
+                                  'status': OUT_OF_MEMORY
+                                  if memory_limit is not None else ERROR,
+                                  'error': 'worker process killed'}
+                    except Exception as error:
+                        result = {'name': name, 'status': ERROR,
+                                  'error': repr(error)}
+                    yield result
+        finally:
+            executor.shutdown()
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('source', help='directory of *.json instances, JSON '
+                                       'lines file, or - for stdin')
+    parser.add_argument('--workers', type=int, default=None)
+    parser.add_argument('--time-limit', type=float, default=None)
+    parser.add_argument('--memory-limit', type=int, default=None,
+                        help='MiB per worker process')
+    parser.add_argument('--solver', choices=SOLVERS, default='cbs')
+    parser.add_argument('--suboptimality', type=float, default=1.5)
+    parser.add_argument('--no-plan', action='store_true')
+    parser.add_argument('--stats', action='store_true',
+                        help='add the search statistics of cbs and ecbs')
+    parser.add_argument('--validate', action='store_true',
+                        help='check every solution for collisions and '
+                             'invalid moves')
+    args = parser.parse_args()
+
+    for result in solve_instances(
+            read_instances(args.source), args.workers, args.time_limit,
+            args.memory_limit, args.solver, args.suboptimality,
+            not args.no_plan, args.stats, args.validate):
+        print(json.dumps(result), flush=True)
+
+
+if __name__ == "__main__":
+    main()
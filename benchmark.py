@@ -0,0 +1,769 @@
+# Benchmarks for the CBS implementation. Every benchmark runs headless on
+# randomly generated grid maps (seeded, so before/after numbers are taken on
+# the same maps) and prints a small table.
+#
+# Usage:
+#   python benchmark.py a_star [--sizes 32 64] [--queries 20]
+#   python benchmark.py ct_memory [--depth 500] [--agents 20]
+#   python benchmark.py hashing [--size 64]
+#   python benchmark.py conflicts [--agents 100 200]
+#   python benchmark.py prioritization [--instances 10] [--agents 12]
+#   python benchmark.py heuristics [--instances 5] [--agents 30]
+#   python benchmark.py splitting [--instances 10] [--agents 14]
+#   python benchmark.py ecbs [--instances 5] [--agents 40] [--weights 1.1 1.5]
+#   python benchmark.py prioritized [--size 64] [--agents 100 200 400]
+#   python benchmark.py parallel [--workers 2 4 8] [--batch-size 8]
+#   python benchmark.py plans [--agents 100 500] [--steps 1000]
+#   python benchmark.py lifelong [--agents 30 80] [--ticks 200] [--window 10]
+#   python benchmark.py movingai --scenarios a.scen b.scen [--map a.map]
+#                               [--agents 10 20 30] [--csv results.csv]
+#
+# The movingai benchmark runs on the standard MAPF benchmark maps and
+# scenarios from https://movingai.com/benchmarks/mapf.html and writes one
+# CSV row per scenario and number of agents, to compare runs against a
+# baseline.
+
+
+import argparse
+import csv
+import os
+import random
+import time
+import tracemalloc
+from copy import deepcopy
+from itertools import zip_longest
+
+import numpy as np
+
+from a_star import AStar
+from batch_solver import ERROR, SOLVERS, make_solver
+from cbs import CBS
+from ecbs import ECBS
+from constraints import Constraints
+from environment import Environment, grid_cache
+from heuristic import distance_map_cache
+from high_level_heuristic import ConflictGraphHeuristic, \
+    DependencyGraphHeuristic, WeightedDependencyGraphHeuristic
+from high_level_node import HighLevelNode
+from lifelong_planner import LifelongPlanner
+from movingai import load_instance
+from position import Position
+from prioritized_planning import PrioritizedPlanning
+from state import State
+from vectorized_conflicts import find_conflicts
+from vectorized_plans import plan_to_actions, validate_plan
+from vertex_constraint import VertexConstraint
+
+
+def random_env_dict(
+        size: int,
+        num_agents: int,
+        obstacle_density: float = 0.2,
+        seed: int = 0) -> dict:
+    """
+    Creates a square random grid with distinct start and goal cells
+
+    :param size: Width and height of the grid
+    :param num_agents: Number of agents to place
+    :param obstacle_density: Probability of a cell being an obstacle
+    :param seed: Seed of the random generator
+    :returns: An env_dict, as consumed by the Environment class
+    """
+    rng = random.Random(seed)
+    cells = [(x, y) for x in range(size) for y in range(size)]
+    obstacles = [cell for cell in cells if rng.random() < obstacle_density]
+    blocked = set(obstacles)
+    free = [cell for cell in cells if cell not in blocked]
+    rng.shuffle(free)
+    starts = free[:num_agents]
+    goals = free[num_agents:2 * num_agents]
+    return {'dimensions': (size, size),
+            'obstacles': obstacles,
+            'agents': [{'name': 'R_' + str(i),
+                        'start': starts[i],
+                        'goal': goals[i]}
+                       for i in range(num_agents)]
+            }
+
+
+class LinearScanAStar(AStar):
+    """
+    The former low-level search, which picks the next state with a linear scan
+    over the open set. Kept here as the baseline for the heap-based search.
+    """
+    def search(self, agent_name):
+        initial_state = self.agent_dict[agent_name]["start"]
+        closed_set = set()
+        open_set = {initial_state}
+        came_from = {}
+        g_score = {initial_state: 0}
+        f_score = {initial_state: self.admissible_heuristic(initial_state,
+                                                            agent_name)}
+        while open_set:
+            temp_dict = {open_item: f_score.setdefault(open_item, float("inf"))
+                         for open_item in open_set}
+            current = min(temp_dict, key=temp_dict.get)
+            if self.is_at_goal(current, agent_name):
+                return self.reconstruct_path(came_from, current)
+            open_set -= {current}
+            closed_set |= {current}
+            self.num_expansions += 1
+            for neighbor in self.get_neighbors(current):
+                if neighbor in closed_set:
+                    continue
+                tentative_g_score = g_score[current] + 1
+                if neighbor not in open_set:
+                    open_set |= {neighbor}
+                elif tentative_g_score >= g_score.get(neighbor, float("inf")):
+                    continue
+                came_from[neighbor] = current
+                g_score[neighbor] = tentative_g_score
+                f_score[neighbor] = tentative_g_score + \
+                    self.admissible_heuristic(neighbor, agent_name)
+        return False
+
+
+def run_low_level(
+        env: Environment,
+        a_star: AStar) -> tuple:
+    """
+    Plans every agent of env on its own, without constraints
+
+    :returns: (expansions, seconds, sum of path lengths)
+    """
+    a_star.num_expansions = 0
+    path_lengths = 0
+    start = time.perf_counter()
+    for agent in env.agent_dict.keys():
+        path = a_star.search(agent)
+        path_lengths += len(path) if path else 0
+    return a_star.num_expansions, time.perf_counter() - start, path_lengths
+
+
+def benchmark_a_star(args) -> None:
+    print('size  search        expansions   seconds   expansions/s')
+    for size in args.sizes:
+        env = Environment(random_env_dict(size, args.queries, seed=args.seed))
+        searches = [('linear scan', LinearScanAStar(env)),
+                    ('heap', AStar(env))]
+        lengths = set()
+        for name, a_star in searches:
+            expansions, seconds, path_lengths = run_low_level(env, a_star)
+            lengths.add(path_lengths)
+            print('{:<5} {:<13} {:>10} {:>9.3f} {:>14.0f}'.format(
+                size, name, expansions, seconds, expansions / seconds))
+        if len(lengths) != 1:
+            raise RuntimeError("Searches disagree on the path lengths")
+
+
+class DeepCopyNode:
+    """
+    The former constraint tree node, which holds the full constraint sets of
+    every agent and is deep-copied to create a child
+    """
+    def __init__(self) -> None:
+        self.solution = {}
+        self.constraint_dict = {}
+
+
+def grow_deepcopy_chain(
+        solution: dict,
+        depth: int) -> list:
+    root = DeepCopyNode()
+    root.solution = solution
+    root.constraint_dict = {agent: Constraints() for agent in solution}
+    nodes = [root]
+    agents = list(solution.keys())
+    for d in range(depth):
+        agent = agents[d % len(agents)]
+        constraint = Constraints()
+        constraint.vertex_constraints.add(VertexConstraint(d, Position(d, d)))
+        node = deepcopy(nodes[-1])
+        node.constraint_dict[agent].add_constraint(constraint)
+        # Stands in for the replanned path
+        node.solution[agent] = list(solution[agent])
+        nodes.append(node)
+    return nodes
+
+
+def grow_linked_chain(
+        solution: dict,
+        depth: int) -> list:
+    root = HighLevelNode()
+    root.solution = solution
+    nodes = [root]
+    agents = list(solution.keys())
+    for d in range(depth):
+        agent = agents[d % len(agents)]
+        constraint = Constraints()
+        constraint.vertex_constraints.add(VertexConstraint(d, Position(d, d)))
+        node = HighLevelNode(nodes[-1], agent, constraint)
+        # The constraints are collected for the low-level search, then dropped
+        node.agent_constraints(agent)
+        node.solution[agent] = list(solution[agent])
+        nodes.append(node)
+    return nodes
+
+
+def benchmark_ct_memory(args) -> None:
+    env = Environment(random_env_dict(32, args.agents, seed=args.seed))
+    solution = env.compute_solution()
+    print('CT of depth {}, {} agents'.format(args.depth, args.agents))
+    print('tree          seconds   retained MiB   peak MiB')
+    for name, grow in [('deepcopy', grow_deepcopy_chain),
+                       ('parent-linked', grow_linked_chain)]:
+        tracemalloc.start()
+        start = time.perf_counter()
+        nodes = grow(solution, args.depth)
+        seconds = time.perf_counter() - start
+        retained, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        print('{:<13} {:>7.3f} {:>14.2f} {:>10.2f}'.format(
+            name, seconds, retained / 2 ** 20, peak / 2 ** 20))
+        del nodes
+
+
+class LegacyPosition:
+    """
+    The former Position, without __slots__
+    """
+    def __init__(self, x, y):
+        self.x = x
+        self.y = y
+
+    def __eq__(self, other):
+        return self.x == other.x and self.y == other.y
+
+
+class LegacyState:
+    """
+    The former State, without __slots__ and hashed through a string
+    """
+    def __init__(self, time, position):
+        self.position = position
+        self.time = time
+
+    def __eq__(self, other):
+        return self.time == other.time and self.position == other.position
+
+    def __hash__(self):
+        return hash(str(self.time) + str(self.position.x) +
+                    str(self.position.y))
+
+
+def benchmark_hashing(args) -> None:
+    keys = [(t, x, y) for t in range(args.size) for x in range(args.size)
+            for y in range(args.size)]
+    print('{} states of a {}x{} grid over {} time steps'.format(
+        len(keys), args.size, args.size, args.size))
+    print('types     bytes/state   hash+insert s   distinct hashes')
+    for name, state_type, position_type in [
+            ('legacy', LegacyState, LegacyPosition),
+            ('slotted', State, Position)]:
+        tracemalloc.start()
+        states = [state_type(t, position_type(x, y)) for t, x, y in keys]
+        allocated = tracemalloc.get_traced_memory()[0]
+        tracemalloc.stop()
+
+        start = time.perf_counter()
+        seen = set()
+        for state in states:
+            seen.add(state)
+        seconds = time.perf_counter() - start
+
+        distinct = len({hash(state) for state in states})
+        print('{:<9} {:>11.1f} {:>15.3f} {:>17}'.format(
+            name, allocated / len(states), seconds, distinct))
+        del states, seen
+
+
+def conflict_key(conflict) -> tuple:
+    return (conflict.time, conflict.conflict_type, conflict.agent_1,
+            conflict.agent_2, str(conflict.position_1),
+            str(conflict.position_2))
+
+
+def benchmark_conflicts(args) -> None:
+    print('agents  conflicts   python s   numpy s   first: python s   numpy s')
+    for num_agents in args.agents:
+        env = Environment(random_env_dict(64, num_agents, seed=args.seed))
+        # Independently planned paths, so there are plenty of conflicts
+        solution = env.compute_solution()
+
+        start = time.perf_counter()
+        python_conflicts = list(env.iter_conflicts(solution))
+        python_seconds = time.perf_counter() - start
+        start = time.perf_counter()
+        numpy_conflicts = find_conflicts(solution)
+        numpy_seconds = time.perf_counter() - start
+
+        start = time.perf_counter()
+        env.get_first_conflict(solution)
+        python_first_seconds = time.perf_counter() - start
+        start = time.perf_counter()
+        numpy_first = find_conflicts(solution, first_only=True)
+        numpy_first_seconds = time.perf_counter() - start
+
+        if [conflict_key(c) for c in python_conflicts] != \
+                [conflict_key(c) for c in numpy_conflicts] or \
+                [conflict_key(c) for c in numpy_first] != \
+                [conflict_key(c) for c in python_conflicts[:1]]:
+            raise RuntimeError("Conflict detectors disagree")
+        print('{:<7} {:>9} {:>10.3f} {:>9.3f} {:>17.4f} {:>9.4f}'.format(
+            num_agents, len(python_conflicts), python_seconds, numpy_seconds,
+            python_first_seconds, numpy_first_seconds))
+
+
+def benchmark_prioritization(args) -> None:
+    print('instance   cost   expanded: first conflict   prioritized')
+    totals = [0, 0]
+    for instance in range(args.instances):
+        env_dict = random_env_dict(args.size, args.agents, obstacle_density=0.1,
+                                   seed=args.seed + instance)
+        costs = set()
+        expanded = []
+        for prioritize_conflicts in (False, True):
+            cbs = CBS(Environment(env_dict), prioritize_conflicts)
+            plan = cbs.search()
+            costs.add(sum(len(path) for path in plan.values())
+                      if plan else '-')
+            expanded.append(cbs.num_expanded)
+        if len(costs) != 1:
+            raise RuntimeError("Solutions of different cost found")
+        totals = [total + e for total, e in zip(totals, expanded)]
+        print('{:<10} {:>4} {:>25} {:>13}'.format(
+            instance, costs.pop(), *expanded))
+    print('{:<15} {:>25} {:>13}'.format('total', *totals))
+
+
+def benchmark_heuristics(args) -> None:
+    heuristics = [('none', lambda: None),
+                  ('CG', ConflictGraphHeuristic),
+                  ('DG', DependencyGraphHeuristic),
+                  ('WDG', WeightedDependencyGraphHeuristic)]
+    print('Node limit {}, "-" when reached'.format(args.node_limit))
+    print('instance heuristic   cost   expanded   seconds')
+    for instance in range(args.instances):
+        env_dict = random_env_dict(args.size, args.agents, obstacle_density=0.1,
+                                   seed=args.seed + instance)
+        costs = set()
+        for name, heuristic in heuristics:
+            cbs = CBS(Environment(env_dict), heuristic=heuristic(),
+                      node_limit=args.node_limit)
+            start = time.perf_counter()
+            plan = cbs.search()
+            seconds = time.perf_counter() - start
+            cost = sum(len(path) for path in plan.values()) if plan else '-'
+            if plan:
+                costs.add(cost)
+            print('{:<8} {:<9} {:>6} {:>10} {:>9.2f}'.format(
+                instance, name, cost, cbs.num_expanded, seconds))
+        if len(costs) > 1:
+            raise RuntimeError("Solutions of different cost found")
+
+
+def benchmark_splitting(args) -> None:
+    print('instance   cost   expanded: standard   disjoint   '
+          'seconds: standard   disjoint')
+    totals = [0, 0, 0.0, 0.0]
+    for instance in range(args.instances):
+        env_dict = random_env_dict(args.size, args.agents, obstacle_density=0.1,
+                                   seed=args.seed + instance)
+        costs = set()
+        expanded = []
+        seconds = []
+        for disjoint_splitting in (False, True):
+            cbs = CBS(Environment(env_dict),
+                      disjoint_splitting=disjoint_splitting)
+            start = time.perf_counter()
+            plan = cbs.search()
+            seconds.append(time.perf_counter() - start)
+            costs.add(sum(len(path) for path in plan.values())
+                      if plan else '-')
+            expanded.append(cbs.num_expanded)
+        if len(costs) != 1:
+            raise RuntimeError("Solutions of different cost found")
+        totals = [total + value for total, value in
+                  zip(totals, expanded + seconds)]
+        print('{:<10} {:>4} {:>19} {:>10} {:>18.2f} {:>10.2f}'.format(
+            instance, costs.pop(), *expanded, *seconds))
+    print('{:<15} {:>19} {:>10} {:>18.2f} {:>10.2f}'.format('total',
+                                                             *totals))
+
+
+def benchmark_ecbs(args) -> None:
+    print('Node limit {}, "-" when reached'.format(args.node_limit))
+    print('instance solver       cost   bound   expanded   seconds')
+    for instance in range(args.instances):
+        env_dict = random_env_dict(args.size, args.agents, obstacle_density=0.1,
+                                   seed=args.seed + instance)
+        solvers = [('CBS', lambda environment: CBS(
+            environment, node_limit=args.node_limit))]
+        solvers += [('ECBS w={}'.format(w), lambda environment, w=w: ECBS(
+            environment, w, node_limit=args.node_limit))
+            for w in args.weights]
+        for name, make_solver in solvers:
+            solver = make_solver(Environment(env_dict))
+            start = time.perf_counter()
+            plan = solver.search()
+            seconds = time.perf_counter() - start
+            cost = sum(len(path) for path in plan.values()) if plan else '-'
+            bound = getattr(solver, 'cost_bound', None)
+            bound = '{:.1f}'.format(bound) if bound is not None else '-'
+            print('{:<8} {:<11} {:>6} {:>7} {:>10} {:>9.2f}'.format(
+                instance, name, cost, bound, solver.num_expanded, seconds))
+
+
+def benchmark_prioritized(args) -> None:
+    print('agents   cost   lower bound   restarts   seconds')
+    for num_agents in args.agents:
+        env_dict = random_env_dict(args.size, num_agents, obstacle_density=0.1,
+                                   seed=args.seed)
+        start = time.perf_counter()
+        planner = PrioritizedPlanning(Environment(env_dict))
+        plan = planner.search()
+        seconds = time.perf_counter() - start
+        print('{:<8} {:>5} {:>13} {:>10} {:>9.2f}'.format(
+            num_agents, planner.result.cost if plan else '-',
+            planner.result.lower_bound, planner.num_restarts, seconds))
+
+
+def benchmark_parallel(args) -> None:
+    # The batch size is fixed, so every run makes the same search and only
+    # the number of worker processes changes
+    print('Batch size {}'.format(args.batch_size))
+    print('instance workers   cost   expanded   seconds   speedup')
+    for instance in range(args.instances):
+        env_dict = random_env_dict(args.size, args.agents, obstacle_density=0.1,
+                                   seed=args.seed + instance)
+        serial_seconds = None
+        for num_workers in [None] + args.workers:
+            cbs = CBS(Environment(env_dict), num_workers=num_workers,
+                      batch_size=args.batch_size, node_limit=args.node_limit)
+            start = time.perf_counter()
+            plan = cbs.search()
+            seconds = time.perf_counter() - start
+            if serial_seconds is None:
+                serial_seconds = seconds
+            cost = sum(len(path) for path in plan.values()) if plan else '-'
+            print('{:<8} {:>7} {:>6} {:>10} {:>9.2f} {:>9.2f}'.format(
+                instance, num_workers or '-', cost, cbs.num_expanded, seconds,
+                serial_seconds / seconds))
+
+
+def loop_extract_moves(solution):
+    """
+    The former main.extract_moves_from_solution, which converts the plan
+    pair of positions by pair of positions. Kept here as the baseline for
+    plan_to_actions.
+    """
+    moves = []
+    for path in solution.values():
+        single_move = []
+        for (_, (x1, y1)), (_, (x2, y2)) in zip(path[:-1], path[1:]):
+            if x2 == x1 and y2 == y1:
+                single_move.append(0)
+            elif x2 == x1 - 1 and y2 == y1:
+                single_move.append(1)
+            elif x2 == x1 + 1 and y2 == y1:
+                single_move.append(2)
+            elif x2 == x1 and y2 == y1 - 1:
+                single_move.append(3)
+            elif x2 == x1 and y2 == y1 + 1:
+                single_move.append(4)
+            else:
+                raise ValueError("Wrong Move detected!")
+        moves.append(single_move)
+    return [list(i) for i in zip_longest(*moves, fillvalue=0)]
+
+
+def random_walk_plan(
+        size: int,
+        num_agents: int,
+        num_steps: int,
+        seed: int = 0) -> tuple:
+    """
+    Random walks on an empty square grid, a plan of fleet size that is not
+    collision-free
+
+    :returns: (env_dict, plan), see CBS.generate_plan
+    """
+    rng = np.random.default_rng(seed)
+    moves = np.array([(0, 0), (-1, 0), (1, 0), (0, -1), (0, 1)])
+    positions = np.empty((num_agents, num_steps + 1, 2), dtype=np.int64)
+    positions[:, 0] = rng.integers(0, size, (num_agents, 2))
+    for t in range(num_steps):
+        step = positions[:, t] + moves[rng.integers(0, 5, num_agents)]
+        inside = ((step >= 0) & (step < size)).all(axis=1)
+        positions[:, t + 1] = np.where(inside[:, None], step, positions[:, t])
+    plan = {'R_' + str(i): [(t, (int(x), int(y)))
+                            for t, (x, y) in enumerate(positions[i])]
+            for i in range(num_agents)}
+    env_dict = {'dimensions': (size, size),
+                'obstacles': [],
+                'agents': [{'name': agent, 'start': path[0][1],
+                            'goal': path[-1][1]}
+                           for agent, path in plan.items()]}
+    return env_dict, plan
+
+
+def benchmark_plans(args) -> None:
+    print('agents   steps   loop s   numpy s   validate s   violations')
+    for num_agents in args.agents:
+        env_dict, plan = random_walk_plan(args.size, num_agents, args.steps,
+                                          seed=args.seed)
+        start = time.perf_counter()
+        loop_moves = loop_extract_moves(plan)
+        loop_seconds = time.perf_counter() - start
+        start = time.perf_counter()
+        actions = plan_to_actions(plan)
+        numpy_seconds = time.perf_counter() - start
+        if actions.tolist() != loop_moves:
+            raise RuntimeError("The action arrays differ")
+        start = time.perf_counter()
+        violations = validate_plan(plan, env_dict)
+        validate_seconds = time.perf_counter() - start
+        print('{:<8} {:>5} {:>8.3f} {:>9.3f} {:>12.3f} {:>12}'.format(
+            num_agents, args.steps, loop_seconds, numpy_seconds,
+            validate_seconds, len(violations)))
+
+
+def benchmark_lifelong(args) -> None:
+    # Agents get a new random goal whenever they reach theirs
+    print('agents   goals reached   replans   mean step s   max step s')
+    for num_agents in args.agents:
+        env_dict = random_env_dict(args.size, num_agents,
+                                   obstacle_density=0.15, seed=args.seed)
+        blocked = set(env_dict['obstacles'])
+        free = [(x, y) for x in range(args.size) for y in range(args.size)
+                if (x, y) not in blocked]
+        rng = random.Random(args.seed)
+        planner = LifelongPlanner(env_dict['dimensions'],
+                                  env_dict['obstacles'], window=args.window,
+                                  commit=args.commit,
+                                  suboptimality=args.suboptimality or None)
+        for agent in env_dict['agents']:
+            planner.add_agent(agent['name'], agent['start'], agent['goal'])
+        reached = 0
+        step_seconds = []
+        for _ in range(args.ticks):
+            start = time.perf_counter()
+            positions = planner.step()
+            step_seconds.append(time.perf_counter() - start)
+            goals = set(planner.goals.values())
+            for agent, position in positions.items():
+                if position == planner.goals[agent]:
+                    reached += 1
+                    planner.set_goal(agent, rng.choice(
+                        [cell for cell in free if cell not in goals]))
+        print('{:<8} {:>13} {:>9} {:>13.4f} {:>12.3f}'.format(
+            num_agents, reached, planner.num_replans,
+            sum(step_seconds) / len(step_seconds), max(step_seconds)))
+
+
+MOVINGAI_FIELDS = ['scenario', 'agents', 'solver', 'status', 'success',
+                   'seconds', 'cost', 'lower_bound', 'ct_expanded',
+                   'ct_generated', 'low_level_expansions', 'peak_memory_mb',
+                   'error']
+
+
+def benchmark_movingai(args) -> None:
+    # Peak memory is measured with tracemalloc, which slows the solvers down
+    # by a roughly constant factor, so runtimes stay comparable between runs
+    # taken with the same options. The grid tables and distance maps cached
+    # by earlier runs are dropped before each run, so that every run builds
+    # and is measured with its own.
+    rows = []
+    for scenario in args.scenarios:
+        failed = False
+        for num_agents in args.agents:
+            row = {'scenario': os.path.basename(scenario),
+                   'agents': num_agents, 'solver': args.solver}
+            if failed and not args.keep_going:
+                # More agents on a scenario the solver failed on
+                row.update(status='skipped', success=0)
+                rows.append(row)
+                continue
+            grid_cache.clear()
+            distance_map_cache.clear()
+            if args.memory:
+                tracemalloc.start()
+            try:
+                environment = Environment(load_instance(scenario, num_agents,
+                                                        args.map))
+                solver = make_solver(environment, args.solver,
+                                     args.time_limit, args.suboptimality)
+                solver.search()
+            except Exception as error:
+                # Recorded as a failed run, like in batch_solver.py
+                failed = True
+                row.update(status=ERROR, success=0, error=repr(error))
+                rows.append(row)
+                print('{:<24} {:>6} {}'.format(row['scenario'], num_agents,
+                                               ERROR))
+                continue
+            finally:
+                if args.memory:
+                    _, peak = tracemalloc.get_traced_memory()
+                    tracemalloc.stop()
+                    row['peak_memory_mb'] = round(peak / 2 ** 20, 2)
+            result = solver.result
+            failed = not result.solved
+            row.update(status=result.status, success=int(result.solved),
+                       seconds=round(result.elapsed, 4), cost=result.cost,
+                       lower_bound=result.lower_bound,
+                       ct_expanded=result.num_expanded,
+                       ct_generated=result.num_generated,
+                       low_level_expansions=(
+                           solver.a_star if isinstance(solver, CBS)
+                           else environment.a_star).num_expansions)
+            rows.append(row)
+            print('{:<24} {:>6} {:<10} {:>8.2f}'.format(
+                row['scenario'], num_agents, result.status, result.elapsed))
+
+    with open(args.csv, 'w', newline='') as file:
+        writer = csv.DictWriter(file, MOVINGAI_FIELDS)
+        writer.writeheader()
+        writer.writerows(rows)
+
+    print('agents   success rate   mean seconds of solved')
+    for num_agents in args.agents:
+        runs = [row for row in rows if row['agents'] == num_agents]
+        solved = [row for row in runs if row['success']]
+        print('{:<8} {:>12.2f} {:>24}'.format(
+            num_agents, len(solved) / len(runs),
+            '{:.2f}'.format(sum(row['seconds'] for row in solved) /
+                            len(solved)) if solved else '-'))
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--seed', type=int, default=0)
+    subparsers = parser.add_subparsers(dest='benchmark', required=True)
+
+    a_star_parser = subparsers.add_parser(
+        'a_star', help='low-level search expansions per second')
+    a_star_parser.add_argument('--sizes', type=int, nargs='+',
+                               default=[32, 64])
+    a_star_parser.add_argument('--queries', type=int, default=20)
+    a_star_parser.set_defaults(run=benchmark_a_star)
+
+    ct_memory_parser = subparsers.add_parser(
+        'ct_memory', help='memory held by a deep constraint tree')
+    ct_memory_parser.add_argument('--depth', type=int, default=500)
+    ct_memory_parser.add_argument('--agents', type=int, default=20)
+    ct_memory_parser.set_defaults(run=benchmark_ct_memory)
+
+    hashing_parser = subparsers.add_parser(
+        'hashing', help='allocation and hashing cost of State')
+    hashing_parser.add_argument('--size', type=int, default=64)
+    hashing_parser.set_defaults(run=benchmark_hashing)
+
+    conflicts_parser = subparsers.add_parser(
+        'conflicts', help='python against numpy conflict detection')
+    conflicts_parser.add_argument('--agents', type=int, nargs='+',
+                                  default=[100, 200])
+    conflicts_parser.set_defaults(run=benchmark_conflicts)
+
+    prioritization_parser = subparsers.add_parser(
+        'prioritization', help='CT nodes expanded with and without conflict '
+                               'prioritization')
+    prioritization_parser.add_argument('--instances', type=int, default=10)
+    prioritization_parser.add_argument('--size', type=int, default=16)
+    prioritization_parser.add_argument('--agents', type=int, default=12)
+    prioritization_parser.set_defaults(run=benchmark_prioritization)
+
+    heuristics_parser = subparsers.add_parser(
+        'heuristics', help='CT nodes expanded with each high-level heuristic')
+    heuristics_parser.add_argument('--instances', type=int, default=5)
+    heuristics_parser.add_argument('--size', type=int, default=24)
+    heuristics_parser.add_argument('--agents', type=int, default=30)
+    heuristics_parser.add_argument('--node-limit', type=int, default=2000)
+    heuristics_parser.set_defaults(run=benchmark_heuristics)
+
+    splitting_parser = subparsers.add_parser(
+        'splitting', help='CT nodes expanded with standard and disjoint '
+                          'splitting')
+    splitting_parser.add_argument('--instances', type=int, default=10)
+    splitting_parser.add_argument('--size', type=int, default=16)
+    splitting_parser.add_argument('--agents', type=int, default=14)
+    splitting_parser.set_defaults(run=benchmark_splitting)
+
+    ecbs_parser = subparsers.add_parser(
+        'ecbs', help='cost and runtime of CBS against ECBS')
+    ecbs_parser.add_argument('--instances', type=int, default=5)
+    ecbs_parser.add_argument('--size', type=int, default=24)
+    ecbs_parser.add_argument('--agents', type=int, default=40)
+    ecbs_parser.add_argument('--weights', type=float, nargs='+',
+                             default=[1.1, 1.5])
+    ecbs_parser.add_argument('--node-limit', type=int, default=2000)
+    ecbs_parser.set_defaults(run=benchmark_ecbs)
+
+    prioritized_parser = subparsers.add_parser(
+        'prioritized', help='prioritized planning on many agents')
+    prioritized_parser.add_argument('--size', type=int, default=64)
+    prioritized_parser.add_argument('--agents', type=int, nargs='+',
+                                    default=[100, 200, 400])
+    prioritized_parser.set_defaults(run=benchmark_prioritized)
+
+    parallel_parser = subparsers.add_parser(
+        'parallel', help='CBS with the low-level searches in worker '
+                         'processes')
+    parallel_parser.add_argument('--instances', type=int, default=3)
+    parallel_parser.add_argument('--size', type=int, default=32)
+    parallel_parser.add_argument('--agents', type=int, default=40)
+    parallel_parser.add_argument('--workers', type=int, nargs='+',
+                                 default=[2, 4, 8])
+    parallel_parser.add_argument('--batch-size', type=int, default=8)
+    parallel_parser.add_argument('--node-limit', type=int, default=500)
+    parallel_parser.set_defaults(run=benchmark_parallel)
+
+    plans_parser = subparsers.add_parser(
+        'plans', help='plan to action conversion and plan validation on '
+                      'random walks')
+    plans_parser.add_argument('--agents', type=int, nargs='+',
+                              default=[100, 500])
+    plans_parser.add_argument('--steps', type=int, default=1000)
+    plans_parser.add_argument('--size', type=int, default=256)
+    plans_parser.set_defaults(run=benchmark_plans)
+
+    lifelong_parser = subparsers.add_parser(
+        'lifelong', help='goals reached and step latency of rolling-horizon '
+                         'planning')
+    lifelong_parser.add_argument('--agents', type=int, nargs='+',
+                                 default=[30, 80])
+    lifelong_parser.add_argument('--size', type=int, default=32)
+    lifelong_parser.add_argument('--ticks', type=int, default=200)
+    lifelong_parser.add_argument('--window', type=int, default=10)
+    lifelong_parser.add_argument('--commit', type=int, default=5)
+    lifelong_parser.add_argument('--suboptimality', type=float, default=1.5,
+                                 help='ECBS factor, 0 for CBS')
+    lifelong_parser.set_defaults(run=benchmark_lifelong)
+
+    movingai_parser = subparsers.add_parser(
+        'movingai', help='success rate, runtime and search effort on MovingAI '
+                         'scenarios, written to CSV')
+    movingai_parser.add_argument('--scenarios', nargs='+', required=True)
+    movingai_parser.add_argument('--map', default=None,
+                                 help='by default the map named in each '
+                                      'scenario, next to the scenario file')
+    movingai_parser.add_argument('--agents', type=int, nargs='+',
+                                 default=[10, 20, 30, 40, 50])
+    movingai_parser.add_argument('--solver', choices=SOLVERS, default='cbs')
+    movingai_parser.add_argument('--suboptimality', type=float, default=1.5)
+    movingai_parser.add_argument('--time-limit', type=float, default=60.0)
+    movingai_parser.add_argument('--csv', default='movingai.csv')
+    movingai_parser.add_argument('--keep-going', action='store_true',
+                                 help='also run the larger numbers of agents '
+                                      'after a failure on a scenario')
+    movingai_parser.add_argument('--no-memory', dest='memory',
+                                 action='store_false',
+                                 help='skip measuring peak memory')
+    movingai_parser.set_defaults(run=benchmark_movingai)
+
+    args = parser.parse_args()
+    args.run(args)
+
+
+if __name__ == "__main__":
+    main()
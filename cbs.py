@@ -1,6 +1,16 @@
 from high_level_node import HighLevelNode
+from high_level_heuristic import HighLevelHeuristic
+from conflict_index import ConflictIndex, OccupancyMap
+from conflict import Conflict
 from constraints import Constraints
-from copy import deepcopy
+from mdd import MDD
+from reservation_table import ReservationTable
+from search_result import SearchProgress, SearchResult
+from search_stats import SearchStats
+from worker_pool import WorkerPool
+from heapq import heappush, heappop
+from itertools import count
+from time import perf_counter
 
 
 class CBS:
@@ -9,59 +19,651 @@ class CBS:
     """
     def __init__(
             self,
-            environment) -> None:
+            environment,
+            prioritize_conflicts: bool = True,
+            heuristic: HighLevelHeuristic = None,
+            node_limit: int = None,
+            disjoint_splitting: bool = False,
+            time_limit: float = None,
+            progress_callback=None,
+            progress_interval: float = None,
+            num_workers: int = None,
+            batch_size: int = None,
+            stats: SearchStats = None,
+            conflict_window: int = None) -> None:
+        """
+        :param environment: The Environment to plan in
+        :param prioritize_conflicts: Split on cardinal conflicts first, then
+                                        on semi-cardinal ones
+        :param heuristic: Admissible high-level heuristic ordering the open
+                            list by cost + h, None for plain CBS
+        :param node_limit: Number of nodes expanded after which the search
+                            gives up and returns {}, None for no limit
+        :param disjoint_splitting: Split a conflict into a positive and a
+                                    negative constraint on one agent instead
+                                    of a negative constraint on each agent
+        :param time_limit: Seconds after which the search gives up and
+                            returns {}, None for no limit. It is checked
+                            between node expansions.
+        :param progress_callback: Called with a SearchProgress whenever the
+                                    lower bound rises or fewer conflicts are
+                                    reached, and every progress_interval
+                                    seconds, None for no callback
+        :param progress_interval: Seconds between two progress reports, None
+                                    to report improvements only
+        :param num_workers: Number of worker processes running the low-level
+                            searches, None to run them in this process.
+                            Only worth it for expensive low-level searches
+                            on many cores, see WorkerPool.
+        :param batch_size: Number of best open nodes expanded at once, by
+                            default num_workers. The search only depends on
+                            the batch size, not on the number of workers.
+        :param stats: Filled in by each search and returned in its result,
+                        None to collect no statistics
+        :param conflict_window: Only the conflicts before this time step are
+                                resolved, so a plan is a solution once its
+                                first conflict_window steps are conflict-free,
+                                as in rolling-horizon planning. None resolves
+                                all conflicts.
+        """
         self.env = environment
-        self.open_set = set()
+        self.prioritize_conflicts = prioritize_conflicts
+        self.heuristic = heuristic if heuristic is not None \
+            else HighLevelHeuristic()
+        self.node_limit = node_limit
+        self.disjoint_splitting = disjoint_splitting
+        self.time_limit = time_limit
+        self.progress_callback = progress_callback
+        self.progress_interval = progress_interval
+        self.num_workers = num_workers
+        self.batch_size = batch_size or num_workers or 1
+        self.stats = stats
+        self.conflict_window = conflict_window
+        # The low-level search, the environment's own unless a subclass
+        # brings one
+        self.a_star = environment.a_star
+        # Whether the phases of the search are timed into stats
+        self.timing = stats is not None and stats.timers
+        # WorkerPool of the running search, None when running serially
+        self.worker_pool = None
+        # Binary heap of HighLevelNodes, ordered by (cost + h, number of
+        # conflicts, node id)
+        self.open_list = []
+        # Fingerprints of the constraint sets of the expanded nodes
         self.closed_set = set()
+        self.node_ids = count()
+        # Rank of each agent, orders the agents of a conflict
+        self.agent_order = {agent: rank for rank, agent in
+                            enumerate(self.env.agent_dict.keys())}
+        # Space-time occupancy of the solution of the last expanded node
+        self.occupancy = OccupancyMap(self.env)
+        # MDDs keyed by (agent, its constraints, its path length)
+        self.mdd_cache = {}
+        self.num_generated = 0
+        self.num_expanded = 0
+        # Best lower bound on the cost of a solution proven so far, and the
+        # least conflicting node generated so far
+        self.lower_bound = 0
+        self.best_node = None
+        self.start_time = 0.0
+        # Time and (lower bound, conflicts) of the last progress report
+        self.last_report_time = 0.0
+        self.last_report = None
+        # Outcome of the last search, a SearchResult
+        self.result = None
+
+    def search(
+            self,
+            initial_constraints: dict = None,
+            warm_start: dict = None):
+        """
+        :param initial_constraints: Constraints applying to the whole search,
+                                    keyed by agent name. The negative
+                                    constraints implied by positive ones
+                                    apply to the other agents too.
+        :param warm_start: Paths for the root, lists of States keyed by agent
+                            name, e.g. from a SolutionCache, see create_root
+        :returns: The plan, see generate_plan, {} if none was found. The
+                    outcome, with the best plan found on a timeout, is kept
+                    in result.
+        """
+        start = self.create_root(initial_constraints, warm_start)
+        if start is None:
+            return self.finish(SearchResult.NO_SOLUTION)
+        heappush(self.open_list, start)
+
+        if self.num_workers is not None:
+            self.worker_pool = WorkerPool(self.env, self.num_workers)
+        try:
+            while self.open_list:
+                batch = []
+                while self.open_list and len(batch) < self.batch_size:
+                    P = heappop(self.open_list)
+                    if P.fingerprint in self.closed_set:
+                        continue
+                    if not P.conflict and batch:
+                        # The nodes popped before it are expanded first
+                        heappush(self.open_list, P)
+                        break
+                    self.closed_set.add(P.fingerprint)
+                    if not batch:
+                        # Nodes are popped in order of cost + h, which never
+                        # decreases from a parent to its children, so the
+                        # first node of a batch bounds every open node
+                        self.lower_bound = max(self.lower_bound,
+                                               P.cost + P.h)
+
+                    if not P.conflict:
+                        # print("A-star solution found")
+                        return self.finish(SearchResult.SOLVED, P)
+                    status = self.check_budget()
+                    if status is not None:
+                        return self.finish(status)
+                    self.num_expanded += 1
+                    batch.append(P)
+
+                for new_node in self.expand(batch):
+                    heappush(self.open_list, new_node)
+                if self.stats is not None:
+                    self.stats.observe_open_size(len(self.open_list))
+        finally:
+            if self.worker_pool is not None:
+                self.worker_pool.shutdown()
+                self.worker_pool = None
+
+        return self.finish(SearchResult.NO_SOLUTION)
+
+    def check_budget(self) -> str:
+        """
+        Reports the progress if due and checks the node and time limits
+
+        :returns: SearchResult.NODE_LIMIT or TIMEOUT if a limit is reached,
+                    else None
+        """
+        if self.num_expanded == self.node_limit:
+            return SearchResult.NODE_LIMIT
+        if self.time_limit is None and self.progress_callback is None:
+            return None
+        now = perf_counter()
+        if self.progress_callback is not None:
+            report = (self.lower_bound, self.best_node.num_conflicts)
+            if report != self.last_report or (
+                    self.progress_interval is not None and
+                    now - self.last_report_time >= self.progress_interval):
+                self.last_report = report
+                self.last_report_time = now
+                self.progress_callback(SearchProgress(
+                    self.num_expanded, self.num_generated,
+                    len(self.open_list), self.lower_bound,
+                    self.best_node.num_conflicts, now - self.start_time))
+        if self.time_limit is not None and \
+                now - self.start_time >= self.time_limit:
+            return SearchResult.TIMEOUT
+        return None
+
+    def finish(
+            self,
+            status: str,
+            node: HighLevelNode = None) -> dict:
+        """
+        Records the outcome of the search in result
+
+        :param status: See SearchResult
+        :param node: The solution node, None if no solution was found
+        :returns: The plan of the solution node, {} without one
+        """
+        if node is None:
+            # The least conflicting plan stands in for the solution
+            plan_node = self.best_node
+            num_conflicts = plan_node.num_conflicts if plan_node else None
+        else:
+            plan_node = node
+            num_conflicts = 0
+        elapsed = perf_counter() - self.start_time
+        if self.stats is not None:
+            if self.stats.profiler is not None:
+                self.stats.profiler.disable()
+            self.stats.num_expanded = self.num_expanded
+            self.stats.num_generated = self.num_generated
+            self.stats.elapsed = elapsed
+        self.result = SearchResult(
+            status,
+            self.generate_plan(plan_node.solution) if plan_node else {},
+            plan_node.cost if plan_node else None,
+            self.lower_bound, num_conflicts, self.num_expanded,
+            self.num_generated, elapsed, self.stats)
+        return self.result.plan if node is not None else {}
+
+    def create_root(
+            self,
+            initial_constraints: dict = None,
+            warm_start: dict = None) -> HighLevelNode:
+        """
+        Resets the search and plans every agent on its own for the root of
+        the constraint tree. A warm start path is taken instead of planning
+        an agent when it is one of the agent's shortest paths and meets the
+        agent's constraints, so the root stays optimal; paths that agreed
+        with each other before start the search with few conflicts.
+
+        :param initial_constraints: Constraints applying to the whole search,
+                                    keyed by agent name
+        :param warm_start: Candidate paths, lists of States keyed by agent
+                            name, None for none
+        :returns: The evaluated root, None if an agent has no path
+        """
+        self.open_list = []
+        self.closed_set = set()
+        self.node_ids = count()
+        self.occupancy = OccupancyMap(self.env)
+        self.mdd_cache = {}
+        self.num_generated = 0
+        self.num_expanded = 0
+        self.lower_bound = 0
+        self.best_node = None
+        self.start_time = perf_counter()
+        self.last_report_time = self.start_time
+        self.last_report = None
+        self.result = None
+        if self.stats is not None:
+            self.stats.reset()
+            if self.stats.profiler is not None:
+                self.stats.profiler.enable()
 
-    def search(self):
         start = HighLevelNode()
-        # TODO: Initialize it in a better way
-        start.constraint_dict = {}
+        start.initial_constraints = self.propagate_constraints(
+            initial_constraints or {})
         for agent in self.env.agent_dict.keys():
-            start.constraint_dict[agent] = Constraints()
-        start.solution = self.env.compute_solution()
-        if not start.solution:
-            return {}
+            path = None
+            if warm_start:
+                path = self.check_warm_start(agent, warm_start.get(agent))
+                if path and agent in start.initial_constraints and \
+                        self.env.violates_constraints(
+                            path, start.initial_constraints[agent]):
+                    path = None
+            if path is None:
+                path = self.plan_agent(start, agent)
+            if not path:
+                return None
+            start.solution[agent] = path
         start.cost = self.env.compute_solution_cost(start.solution)
+        start.conflict_index = ConflictIndex(self.agent_order)
+        if self.timing:
+            self.timed(SearchStats.CONFLICT_DETECTION, self.index_root, start)
+        else:
+            self.index_root(start)
+        self.evaluate_node(start)
+        return start
+
+    def propagate_constraints(
+            self,
+            initial_constraints: dict) -> dict:
+        """
+        Adds the negative constraints implied by the positive initial
+        constraints of each agent to the initial constraints of the others,
+        as HighLevelNode.agent_constraints does for the nodes' constraints
+
+        :param initial_constraints: Constraints keyed by agent name, left
+                                    unchanged
+        :returns: A new dict of Constraints keyed by agent name
+        """
+        implied = {agent: constraints.implied_constraints()
+                   for agent, constraints in initial_constraints.items()
+                   if constraints.has_positive_constraints()}
+        if not implied:
+            return dict(initial_constraints)
+        propagated = {}
+        for agent in self.env.agent_dict.keys():
+            constraints = Constraints()
+            if agent in initial_constraints:
+                constraints.add_constraint(initial_constraints[agent])
+            for other, other_implied in implied.items():
+                if other != agent:
+                    constraints.add_constraint(other_implied)
+            propagated[agent] = constraints
+        return propagated
+
+    def check_warm_start(
+            self,
+            agent,
+            path: list) -> list:
+        """
+        :returns: The path if it is a shortest path of the agent from its
+                    start to its goal, else None
+        """
+        if not path:
+            return None
+        start = self.env.agent_dict[agent]['start']
+        goal = self.env.agent_dict[agent]['goal']
+        if path[0] != start or path[-1].position != goal.position or \
+                len(path) - 1 != self.env.distance_maps[agent][
+                    self.env.cell_index(start.position)]:
+            return None
+        for t, (state, next_state) in enumerate(zip(path, path[1:])):
+            if next_state.time != t + 1 or \
+                    self.env.cell_index(next_state.position) not in [
+                        cell for cell, _ in self.env.neighbor_table[
+                            self.env.cell_index(state.position)]]:
+                return None
+        return path
+
+    def index_root(
+            self,
+            start: HighLevelNode) -> None:
+        """
+        Finds the conflicts of the root's paths, adding the paths to the
+        occupancy map one after the other
+        """
+        for agent, path in start.solution.items():
+            start.conflict_index.add_conflicts(self.find_conflicts(agent,
+                                                                   path))
+            self.occupancy.add_path(agent, path)
+
+    def find_conflicts(
+            self,
+            agent,
+            path: list) -> list:
+        """
+        :returns: The conflicts of an agent's path with the other paths in
+                    the occupancy map, within the conflict window
+        """
+        conflicts = self.occupancy.find_conflicts(agent, path,
+                                                  self.agent_order)
+        if self.conflict_window is not None:
+            conflicts = [conflict for conflict in conflicts
+                         if conflict.time < self.conflict_window]
+        return conflicts
+
+    def timed(
+            self,
+            phase: str,
+            function,
+            *args):
+        """
+        Calls function(*args), adding its duration to a phase of stats. The
+        callers check timing first, so nothing is timed without stats.
+
+        :returns: What function returns
+        """
+        start = perf_counter()
+        result = function(*args)
+        self.stats.add_time(phase, perf_counter() - start)
+        return result
 
-        self.open_set |= {start}
+    def generate_children(
+            self,
+            P: HighLevelNode) -> list:
+        """
+        Splits a node on one of its conflicts
+
+        :param P: The node to expand, holding at least one conflict
+        :returns: The evaluated children that were not expanded before
+        """
+        return self.expand([P])
+
+    def expand(
+            self,
+            batch: list) -> list:
+        """
+        Splits every node of a batch on one of its conflicts and replans the
+        children. With a worker pool all the low-level searches of the batch
+        run in parallel; the children are still completed one after the
+        other, in the order of the batch, so the search does not depend on
+        which worker finishes first.
+
+        :param batch: The nodes to expand, each holding at least one conflict
+        :returns: The evaluated children that were not expanded before
+        """
+        children = [child for P in batch for child in self.split_node(P)]
+        paths = None
+        if self.worker_pool is not None:
+            tasks = [(agent, new_node.agent_constraints(agent))
+                     for new_node, agents in children for agent in agents]
+            paths = iter(self.timed(SearchStats.LOW_LEVEL,
+                                    self.worker_pool.plan, tasks)
+                         if self.timing else self.worker_pool.plan(tasks))
+            if self.stats is not None:
+                for agent, _ in tasks:
+                    self.stats.record_low_level(agent, None)
+
+        new_nodes = []
+        for new_node, agents in children:
+            planned = [next(paths) for _ in agents] if paths else None
+            if not self.replan(new_node, agents, planned):
+                continue
+
+            self.evaluate_node(new_node)
+            if new_node.fingerprint not in self.closed_set:
+                new_nodes.append(new_node)
+        return new_nodes
+
+    def split_node(
+            self,
+            P: HighLevelNode) -> list:
+        """
+        Creates the children of a node, without planning them
+
+        :param P: The node to split, holding at least one conflict
+        :returns: A list of (child, agents to replan) pairs
+        """
+        conflict = P.conflict
+        if self.prioritize_conflicts:
+            conflict = self.timed(SearchStats.CONFLICT_SELECTION,
+                                  self.choose_conflict, P) \
+                if self.timing else self.choose_conflict(P)
+        if self.timing:
+            start = perf_counter()
+        if self.disjoint_splitting:
+            children = self.env.create_disjoint_constraints_from_conflict(
+                conflict)
+        else:
+            children = self.env.create_constraints_from_conflict(
+                conflict).items()
+
+        split = []
+        for agent, constraint in children:
+            if P.agent_constraints(agent).includes(constraint):
+                # The child would duplicate its parent
+                continue
+            new_node = HighLevelNode(P, agent, constraint)
+            split.append((new_node, self.agents_to_replan(new_node, agent)))
+        if self.timing:
+            self.stats.add_time(SearchStats.NODE_CREATION,
+                                perf_counter() - start)
+        return split
+
+    def agents_to_replan(
+            self,
+            node: HighLevelNode,
+            agent) -> list:
+        """
+        The agents whose paths break the constraints of a new node: the
+        constrained agent, unless its constraint is positive and its path
+        already satisfies it, and the other agents whose paths break the
+        constraints implied by a positive one
+
+        :param node: The new node, still holding its parent's solution
+        :param agent: The agent constrained by the node
+        :returns: A list of agents, in the order of the solution
+        """
+        if node.implied_constraints is None:
+            return [agent]
+        return [other for other, path in node.solution.items()
+                if self.env.violates_constraints(
+                    path, node.constraint if other == agent
+                    else node.implied_constraints)]
 
-        while self.open_set:
-            P = min(self.open_set)
-            self.open_set -= {P}
-            self.closed_set |= {P}
+    def replan(
+            self,
+            node: HighLevelNode,
+            agents: list,
+            paths: list = None) -> bool:
+        """
+        Replans agents of a new node one after the other. Every other agent
+        keeps the path it has in the parent node, so only the conflicts of
+        the replanned agents are updated in the node's conflict index.
+
+        :param node: The new node, holding its parent's solution, cost and
+                        conflict index
+        :param agents: The agents to replan
+        :param paths: The new paths of the agents if they were already
+                        planned, e.g. by a worker pool
+        :returns: False if an agent has no path under its constraints
+        """
+        node.conflict_index = node.parent.conflict_index
+        self.sync_occupancy(node.solution)
+        for index, agent in enumerate(agents):
+            path = self.plan_agent(node, agent) if paths is None \
+                else paths[index]
+            if not path:
+                return False
+            node.cost += len(path) - len(node.solution[agent])
+            conflicts = self.timed(
+                SearchStats.CONFLICT_DETECTION, self.find_conflicts, agent,
+                path) if self.timing else self.find_conflicts(agent, path)
+            node.conflict_index = node.conflict_index.replace_agent(
+                agent, conflicts)
+            node.solution[agent] = path
+            if len(agents) > 1:
+                # The next agents' conflicts are found against this new path
+                self.sync_occupancy(node.solution)
+        return True
+
+    def sync_occupancy(
+            self,
+            solution: dict) -> None:
+        if self.timing:
+            self.timed(SearchStats.CONFLICT_DETECTION, self.occupancy.sync,
+                       solution)
+        else:
+            self.occupancy.sync(solution)
+
+    def plan_agent(
+            self,
+            node: HighLevelNode,
+            agent):
+        """
+        Runs the low-level search for one agent of a node under the agent's
+        constraints in that node
+
+        :param node: The node, its solution holds the other agents' paths
+        :param agent: The agent to plan
+        :returns: The path of the agent, False if none exists
+        """
+        self.env.constraint_dict = {agent: node.agent_constraints(agent)}
+        a_star = self.a_star
+        if self.stats is None:
+            return self.env.compute_agent_solution(agent, node.solution,
+                                                   a_star)
+        num_expansions = a_star.num_expansions
+        path = self.timed(SearchStats.LOW_LEVEL,
+                          self.env.compute_agent_solution, agent,
+                          node.solution, a_star) if self.timing \
+            else self.env.compute_agent_solution(agent, node.solution, a_star)
+        self.stats.record_low_level(agent,
+                                    a_star.num_expansions - num_expansions)
+        return path
 
-            self.env.constraint_dict = P.constraint_dict
-            conflict_dict = self.env.get_first_conflict(P.solution)
-            if not conflict_dict:
-                # print("A-star solution found")
-                return self.generate_plan(P.solution)
+    def evaluate_node(
+            self,
+            node: HighLevelNode) -> None:
+        """
+        Fills in the conflicts and ordering keys of a freshly generated node
+
+        :param node: Node whose solution, cost and conflict index are already
+                        computed
+        """
+        node.num_conflicts = len(node.conflict_index)
+        node.conflict = node.conflict_index.first_conflict()
+        node.node_id = next(self.node_ids)
+        if self.best_node is None or (node.num_conflicts, node.cost) < \
+                (self.best_node.num_conflicts, self.best_node.cost):
+            self.best_node = node
+        if node.conflict is not None:
+            # A child can't cost less than its parent's bound
+            node.h = self.timed(SearchStats.HEURISTIC, self.heuristic.compute,
+                                self, node) if self.timing \
+                else self.heuristic.compute(self, node)
+            if node.parent is not None:
+                node.h = max(node.h, node.parent.cost + node.parent.h -
+                             node.cost)
+        self.num_generated += 1
 
-            constraint_dict = self.env.create_constraints_from_conflict(
-                conflict_dict)
+    def choose_conflict(
+            self,
+            node: HighLevelNode) -> Conflict:
+        """
+        Picks the conflict to split a node on: the first cardinal conflict,
+        else the first semi-cardinal one, else the first conflict. Splitting
+        on a cardinal conflict raises the cost of both children, which keeps
+        the constraint tree small.
 
-            for agent in constraint_dict.keys():
-                new_node = deepcopy(P)
-                new_node.constraint_dict[agent].add_constraint(
-                    constraint_dict[agent])
+        :param node: The node to expand
+        :returns: A Conflict of the node's solution
+        """
+        semi_cardinal = None
+        conflicts = node.conflict_index.conflicts
+        for key in sorted(conflicts):
+            cardinality = self.classify_conflict(node, conflicts[key])
+            if cardinality == Conflict.CARDINAL:
+                return conflicts[key]
+            if cardinality == Conflict.SEMI_CARDINAL and semi_cardinal is None:
+                semi_cardinal = conflicts[key]
+        return semi_cardinal if semi_cardinal is not None else node.conflict
 
-                self.env.constraint_dict = new_node.constraint_dict
-                new_node.solution = self.env.compute_solution()
-                if not new_node.solution:
-                    continue
-                # else:
-                #     print(new_node.solution)
-                #     return self.generate_plan(new_node.solution)
-                new_node.cost = self.env.compute_solution_cost(
-                    new_node.solution)
-                # print(new_node.cost)
+    def classify_conflict(
+            self,
+            node: HighLevelNode,
+            conflict: Conflict) -> int:
+        """
+        Counts the agents of a conflict whose MDD is a single cell at the
+        conflict, i.e. that cannot avoid it without a longer path
 
-                # TODO: ending condition
-                if new_node not in self.closed_set:
-                    self.open_set |= {new_node}
+        :returns: Conflict.CARDINAL, SEMI_CARDINAL or NON_CARDINAL
+        """
+        cell_1 = self.env.cell_index(conflict.position_1)
+        mdd_1 = self.get_mdd(node, conflict.agent_1)
+        mdd_2 = self.get_mdd(node, conflict.agent_2)
+        t = conflict.time
+        if conflict.conflict_type == Conflict.VERTEX:
+            return mdd_1.is_singleton(t, cell_1) + \
+                mdd_2.is_singleton(t, cell_1)
+        cell_2 = self.env.cell_index(conflict.position_2)
+        return (mdd_1.is_singleton(t, cell_1) and
+                mdd_1.is_singleton(t + 1, cell_2)) + \
+            (mdd_2.is_singleton(t, cell_2) and
+             mdd_2.is_singleton(t + 1, cell_1))
 
-        return {}
+    def agent_key(
+            self,
+            node: HighLevelNode,
+            agent) -> tuple:
+        """
+        Identifies an agent's situation in a node: its constraints and its
+        path length. Nodes with equal keys have equal MDDs for the agent.
+        """
+        constraints = node.agent_constraints(agent)
+        return (agent, frozenset(constraints.vertex_constraints),
+                frozenset(constraints.edge_constraints),
+                frozenset(constraints.positive_vertex_constraints),
+                frozenset(constraints.positive_edge_constraints),
+                len(node.solution[agent]))
+
+    def get_mdd(
+            self,
+            node: HighLevelNode,
+            agent) -> MDD:
+        """
+        Returns the MDD of an agent in a node, built on first use
+        """
+        key = self.agent_key(node, agent)
+        mdd = self.mdd_cache.get(key)
+        if mdd is None:
+            mdd = MDD(self.env, agent,
+                      ReservationTable.from_constraints(
+                          node.agent_constraints(agent), self.env),
+                      len(node.solution[agent]))
+            self.mdd_cache[key] = mdd
+        return mdd
 
     @staticmethod
     def generate_plan(solution):
@@ -72,4 +674,4 @@ class CBS:
             path_list = [(state.time, (state.position.x, state.position.y))
                          for state in path]
             plan[agent] = path_list
-        return plan
\ No newline at end of file
+        return plan
@@ -17,9 +17,18 @@ class Conflict:
     An edge conflict occurs when agents plan to traverse the same edge at the
     same time stamp.
     """
+    __slots__ = ('time', 'conflict_type', 'agent_1', 'agent_2', 'position_1',
+                 'position_2')
+
     VERTEX = 1
     EDGE = 2
 
+    # Cardinality: for how many of the two agents every shortest path runs
+    # into the conflict, see CBS.classify_conflict
+    NON_CARDINAL = 0
+    SEMI_CARDINAL = 1
+    CARDINAL = 2
+
     def __init__(
             self) -> None:
         self.time = -1
@@ -0,0 +1,206 @@
+from __future__ import annotations
+from conflict import Conflict
+
+
+class OccupancyMap:
+    """
+    Space-time occupancy of the paths of a solution, over the flat cell
+    indices of an Environment. It answers, for one agent's path, which
+    other agents it collides with in O(length of the path).
+
+    vertices maps a packed (time, cell) to the agents at that cell at that
+    time and moves maps a packed (time, from cell, to cell) to the agents
+    making that move. visits maps a cell to {agent: times} and parked maps a
+    cell to {agent: time} for the agents that stay there once their path
+    has ended.
+    """
+    def __init__(
+            self,
+            environment) -> None:
+        self.cell_index = environment.cell_index
+        self.num_cells = environment.num_cells
+        self.paths = {}
+        self.vertices = {}
+        self.moves = {}
+        self.visits = {}
+        self.parked = {}
+
+    def add_path(
+            self,
+            agent,
+            path: list) -> None:
+        num_cells = self.num_cells
+        self.paths[agent] = path
+        cells = [self.cell_index(state.position) for state in path]
+        for t, cell in enumerate(cells):
+            self.vertices.setdefault(t * num_cells + cell, set()).add(agent)
+            self.visits.setdefault(cell, {}).setdefault(agent, []).append(t)
+        for t in range(len(cells) - 1):
+            if cells[t] != cells[t + 1]:
+                self.moves.setdefault(
+                    (t * num_cells + cells[t]) * num_cells + cells[t + 1],
+                    set()).add(agent)
+        self.parked.setdefault(cells[-1], {})[agent] = len(cells) - 1
+
+    def remove_path(
+            self,
+            agent) -> None:
+        num_cells = self.num_cells
+        path = self.paths.pop(agent)
+        cells = [self.cell_index(state.position) for state in path]
+        for t, cell in enumerate(cells):
+            key = t * num_cells + cell
+            self.vertices[key].discard(agent)
+            if not self.vertices[key]:
+                del self.vertices[key]
+            self.visits[cell].pop(agent, None)
+        for t in range(len(cells) - 1):
+            if cells[t] != cells[t + 1]:
+                key = (t * num_cells + cells[t]) * num_cells + cells[t + 1]
+                self.moves[key].discard(agent)
+                if not self.moves[key]:
+                    del self.moves[key]
+        del self.parked[cells[-1]][agent]
+
+    def sync(
+            self,
+            solution: dict) -> None:
+        """
+        Makes the map hold exactly the paths of solution. Paths are shared
+        between the nodes of the constraint tree, so only the paths that are
+        not the very same objects are exchanged.
+        """
+        for agent in list(self.paths.keys()):
+            if agent not in solution:
+                self.remove_path(agent)
+        for agent, path in solution.items():
+            if self.paths.get(agent) is not path:
+                if agent in self.paths:
+                    self.remove_path(agent)
+                self.add_path(agent, path)
+
+    def find_conflicts(
+            self,
+            agent,
+            path: list,
+            agent_order: dict) -> list:
+        """
+        Finds the conflicts of a path with the paths of all other agents in
+        the map. Entries of agent itself are ignored, so the map may still
+        hold the agent's previous path.
+
+        :param agent: The agent the path belongs to
+        :param path: The path to check
+        :param agent_order: Rank of every agent, the lower ranked agent of a
+                            pair becomes agent_1 as in Environment.iter_conflicts
+        :returns: A list of Conflict objects, in no particular order
+        """
+        num_cells = self.num_cells
+        cells = [self.cell_index(state.position) for state in path]
+        last = len(cells) - 1
+        conflicts = []
+
+        for t, cell in enumerate(cells):
+            for other in self.vertices.get(t * num_cells + cell, ()):
+                if other != agent:
+                    conflicts.append(self.make_conflict(
+                        Conflict.VERTEX, t, agent, path, other, agent_order))
+            for other, goal_time in self.parked.get(cell, {}).items():
+                if other != agent and goal_time < t:
+                    conflicts.append(self.make_conflict(
+                        Conflict.VERTEX, t, agent, path, other, agent_order))
+            if t < last and cell != cells[t + 1]:
+                swap = (t * num_cells + cells[t + 1]) * num_cells + cell
+                for other in self.moves.get(swap, ()):
+                    if other != agent:
+                        conflicts.append(self.make_conflict(
+                            Conflict.EDGE, t, agent, path, other,
+                            agent_order))
+
+        # Other agents passing through the goal after the agent has parked
+        for other, times in self.visits.get(cells[-1], {}).items():
+            if other != agent:
+                for t in times:
+                    if t > last:
+                        conflicts.append(self.make_conflict(
+                            Conflict.VERTEX, t, agent, path, other,
+                            agent_order))
+        return conflicts
+
+    @staticmethod
+    def make_conflict(
+            conflict_type: int,
+            t: int,
+            agent,
+            path: list,
+            other,
+            agent_order: dict) -> Conflict:
+        result = Conflict()
+        result.time = t
+        result.conflict_type = conflict_type
+        state = path[min(t, len(path) - 1)]
+        if conflict_type == Conflict.VERTEX:
+            result.position_1 = state.position
+        if agent_order[agent] < agent_order[other]:
+            result.agent_1, result.agent_2 = agent, other
+            if conflict_type == Conflict.EDGE:
+                result.position_1 = state.position
+                result.position_2 = path[t + 1].position
+        else:
+            result.agent_1, result.agent_2 = other, agent
+            if conflict_type == Conflict.EDGE:
+                # The other agent makes the reverse move
+                result.position_1 = path[t + 1].position
+                result.position_2 = state.position
+        return result
+
+
+class ConflictIndex:
+    """
+    The conflicts of the solution of a constraint tree node, keyed by
+    (time, conflict type, rank of agent_1, rank of agent_2). Ordering the keys
+    orders the conflicts as Environment.iter_conflicts does, so the smallest
+    key is the first conflict.
+
+    A child differs from its parent in one path only, so its index is the
+    parent's without that agent's entries, plus the conflicts of the new path
+    found through an OccupancyMap of the other agents.
+    """
+    def __init__(
+            self,
+            agent_order: dict) -> None:
+        self.agent_order = agent_order
+        self.conflicts = {}
+
+    def add_conflicts(
+            self,
+            conflicts: list) -> None:
+        for conflict in conflicts:
+            self.conflicts[(conflict.time, conflict.conflict_type,
+                            self.agent_order[conflict.agent_1],
+                            self.agent_order[conflict.agent_2])] = conflict
+
+    def replace_agent(
+            self,
+            agent,
+            conflicts: list) -> ConflictIndex:
+        """
+        :param agent: The replanned agent
+        :param conflicts: The conflicts of the agent's new path
+        :returns: A new index, this one is left unchanged
+        """
+        rank = self.agent_order[agent]
+        index = ConflictIndex(self.agent_order)
+        index.conflicts = {key: conflict
+                           for key, conflict in self.conflicts.items()
+                           if key[2] != rank and key[3] != rank}
+        index.add_conflicts(conflicts)
+        return index
+
+    def first_conflict(self) -> Conflict:
+        if not self.conflicts:
+            return None
+        return self.conflicts[min(self.conflicts)]
+
+    def __len__(self) -> int:
+        return len(self.conflicts)
@@ -1,22 +1,78 @@
 from __future__ import annotations
+from vertex_constraint import VertexConstraint
+from edge_constraint import EdgeConstraint
 
 
 class Constraints:
     """
     Used to add the constraints to the top-level CBS tree.
+
+    vertex_constraints and edge_constraints are negative: the agent may not
+    be at a position, or make a move, at a time step. The positive sets,
+    used by disjoint splitting, hold the positions the agent must be at and
+    the moves it must make.
     """
     def __init__(
             self) -> None:
         self.vertex_constraints = set()
         self.edge_constraints = set()
+        self.positive_vertex_constraints = set()
+        self.positive_edge_constraints = set()
 
     def add_constraint(
             self,
             other: Constraints) -> None:
         self.vertex_constraints |= other.vertex_constraints
         self.edge_constraints |= other.edge_constraints
+        self.positive_vertex_constraints |= other.positive_vertex_constraints
+        self.positive_edge_constraints |= other.positive_edge_constraints
+
+    def includes(
+            self,
+            other: Constraints) -> bool:
+        """
+        Checks if every constraint of other is already in this set
+        """
+        return self.vertex_constraints >= other.vertex_constraints and \
+            self.edge_constraints >= other.edge_constraints and \
+            self.positive_vertex_constraints >= \
+            other.positive_vertex_constraints and \
+            self.positive_edge_constraints >= other.positive_edge_constraints
+
+    def has_positive_constraints(self) -> bool:
+        return bool(self.positive_vertex_constraints or
+                    self.positive_edge_constraints)
+
+    def implied_constraints(self) -> Constraints:
+        """
+        The negative constraints the positive ones put on every other agent.
+        An agent that must be at a position keeps the others off it, and an
+        agent that must move from position_1 to position_2 keeps the others
+        off both ends of the move and from making the reverse move.
+
+        :returns: A new Constraints object, empty without positive constraints
+        """
+        implied = Constraints()
+        for vertex_constraint in self.positive_vertex_constraints:
+            implied.vertex_constraints.add(vertex_constraint)
+        for edge_constraint in self.positive_edge_constraints:
+            time = edge_constraint.time
+            implied.vertex_constraints.add(
+                VertexConstraint(time, edge_constraint.position_1))
+            implied.vertex_constraints.add(
+                VertexConstraint(time + 1, edge_constraint.position_2))
+            implied.edge_constraints.add(
+                EdgeConstraint(time, edge_constraint.position_2,
+                               edge_constraint.position_1))
+        return implied
 
     def __str__(
             self) -> str:
-        return "VC: " + str([str(vc) for vc in self.vertex_constraints]) + \
+        text = "VC: " + str([str(vc) for vc in self.vertex_constraints]) + \
             "EC: " + str([str(ec) for ec in self.edge_constraints])
+        if self.has_positive_constraints():
+            text += "PVC: " + str([str(vc) for vc in
+                                   self.positive_vertex_constraints]) + \
+                "PEC: " + str([str(ec) for ec in
+                               self.positive_edge_constraints])
+        return text
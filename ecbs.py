@@ -0,0 +1,172 @@
+from cbs import CBS
+from focal_search import FocalSearch
+from high_level_node import HighLevelNode
+from search_result import SearchResult
+from search_stats import SearchStats
+from heapq import heappush, heappop
+
+
+class ECBS(CBS):
+    """
+    Enhanced CBS, a bounded-suboptimal variant of CBS. Both levels use focal
+    search with the same suboptimality factor w:
+    - every low-level path is found by FocalSearch, which prefers paths with
+      fewer conflicts among those at most w times longer than a shortest
+      path, and yields a lower bound on the agent's cost
+    - the high level keeps its open list ordered by the nodes' lower bounds
+      (the sums of the agents' lower bounds) and expands, among the nodes
+      costing at most w times the smallest lower bound, the one with the
+      fewest conflicts
+
+    A returned plan costs at most cost_bound = w * lower_bound, where
+    lower_bound is a lower bound on the optimal cost.
+    """
+    def __init__(
+            self,
+            environment,
+            suboptimality: float = 1.5,
+            node_limit: int = None,
+            disjoint_splitting: bool = False,
+            time_limit: float = None,
+            progress_callback=None,
+            progress_interval: float = None,
+            stats: SearchStats = None,
+            conflict_window: int = None) -> None:
+        """
+        :param environment: The Environment to plan in. The low-level
+                            searches run a FocalSearch of this solver, the
+                            environment's own search is left as it is.
+        :param suboptimality: Factor w >= 1 bounding the cost of the plan
+        :param node_limit: Number of nodes expanded after which the search
+                            gives up and returns {}, None for no limit
+        :param disjoint_splitting: See CBS
+        :param time_limit: See CBS
+        :param progress_callback: See CBS
+        :param progress_interval: See CBS
+        :param stats: See CBS
+        :param conflict_window: See CBS
+        """
+        # Cardinal conflicts are defined on shortest paths, the first
+        # conflict is split on instead
+        super().__init__(environment, prioritize_conflicts=False,
+                         node_limit=node_limit,
+                         disjoint_splitting=disjoint_splitting,
+                         time_limit=time_limit,
+                         progress_callback=progress_callback,
+                         progress_interval=progress_interval,
+                         stats=stats, conflict_window=conflict_window)
+        self.a_star = FocalSearch(environment, suboptimality,
+                                  environment.a_star.max_expansions)
+        self.suboptimality = suboptimality
+        # Binary heaps of the nodes in focal, ordered by (number of
+        # conflicts, cost, node id), and of the nodes too costly to be in
+        # focal yet, ordered by (cost, node id)
+        self.focal_list = []
+        self.waiting_list = []
+        # Bound on the cost of the plan last returned, lower_bound is the
+        # smallest lower bound over the open nodes
+        self.cost_bound = None
+
+    def search(
+            self,
+            initial_constraints: dict = None,
+            warm_start: dict = None):
+        """
+        :param initial_constraints: See CBS.search
+        :param warm_start: See CBS.search
+        :returns: The plan, see generate_plan, {} if none was found. Its cost
+                    is at most cost_bound. The outcome is kept in result, as
+                    for CBS.
+        """
+        self.focal_list = []
+        self.waiting_list = []
+        self.cost_bound = None
+        start = self.create_root(initial_constraints, warm_start)
+        if start is None:
+            return self.finish(SearchResult.NO_SOLUTION)
+        self.lower_bound = start.lower_bound
+        self.push_node(start)
+
+        while True:
+            P = self.pop_node()
+            if P is None:
+                return self.finish(SearchResult.NO_SOLUTION)
+            if P.fingerprint in self.closed_set:
+                continue
+            self.closed_set.add(P.fingerprint)
+
+            if not P.conflict:
+                self.cost_bound = self.suboptimality * self.lower_bound
+                return self.finish(SearchResult.SOLVED, P)
+            status = self.check_budget()
+            if status is not None:
+                return self.finish(status)
+            self.num_expanded += 1
+
+            for new_node in self.generate_children(P):
+                self.push_node(new_node)
+            if self.stats is not None:
+                self.stats.observe_open_size(len(self.open_list))
+
+    def push_node(
+            self,
+            node: HighLevelNode) -> None:
+        heappush(self.open_list, (node.lower_bound, node.node_id, node))
+        if node.cost <= self.suboptimality * self.lower_bound:
+            heappush(self.focal_list,
+                     (node.num_conflicts, node.cost, node.node_id, node))
+        else:
+            heappush(self.waiting_list, (node.cost, node.node_id, node))
+
+    def pop_node(self) -> HighLevelNode:
+        """
+        Raises the lower bound to the smallest one of the open nodes, moves
+        the nodes the raised bound admits into focal and pops the best
+        node of focal
+
+        :returns: A node, possibly already expanded, None if none is open
+        """
+        while self.open_list and \
+                self.open_list[0][-1].fingerprint in self.closed_set:
+            heappop(self.open_list)
+        if not self.open_list:
+            return None
+        lower_bound = self.open_list[0][0]
+        if lower_bound > self.lower_bound:
+            self.lower_bound = lower_bound
+            bound = self.suboptimality * lower_bound
+            while self.waiting_list and self.waiting_list[0][0] <= bound:
+                cost, node_id, node = heappop(self.waiting_list)
+                heappush(self.focal_list,
+                         (node.num_conflicts, cost, node_id, node))
+        # The node with the smallest lower bound is always in focal: its
+        # paths are at most w times longer than their lower bounds
+        return heappop(self.focal_list)[-1]
+
+    def create_root(
+            self,
+            initial_constraints: dict = None,
+            warm_start: dict = None) -> HighLevelNode:
+        start = super().create_root(initial_constraints, warm_start)
+        if start is not None:
+            # Warm start paths are shortest paths, their lengths are their
+            # agents' lower bounds
+            for agent, path in start.solution.items():
+                if agent not in start.lower_bounds:
+                    start.lower_bounds[agent] = len(path)
+                    start.lower_bound += len(path)
+        return start
+
+    def plan_agent(
+            self,
+            node: HighLevelNode,
+            agent):
+        path = super().plan_agent(node, agent)
+        if path:
+            # Constraints only grow down the tree, so the parent's bound
+            # still holds
+            lower_bound = max(self.a_star.lower_bound,
+                              node.lower_bounds.get(agent, 0))
+            node.lower_bound += lower_bound - node.lower_bounds.get(agent, 0)
+            node.lower_bounds[agent] = lower_bound
+        return path
@@ -1,5 +1,5 @@
 from __future__ import annotations
-from position import Position
+from position import Position, COORDINATE_BITS
 
 
 class EdgeConstraint:
@@ -7,6 +7,8 @@ class EdgeConstraint:
     An edge constraint is constraint which defines an edge to be added in the
     top-level CBS tree.
     """
+    __slots__ = ('time', 'position_1', 'position_2')
+
     def __init__(
             self,
             time: int,
@@ -19,13 +21,25 @@ class EdgeConstraint:
     def __eq__(
             self,
             other: EdgeConstraint) -> bool:
+        if not isinstance(other, EdgeConstraint):
+            return NotImplemented
         return self.time == other.time and self.position_1 == other.position_1 \
             and self.position_2 == other.position_2
 
     def __hash__(
             self) -> hash:
-        """Added to make this class hashable"""
-        return hash(str(self.time)+str(self.position_1) + str(self.position_2))
+        """
+        Packs (time, x_1, y_1) and the direction of the move into a single
+        integer. Edges always join neighbouring cells, so the direction
+        identifies position_2 in four bits.
+        """
+        dx = self.position_2.x - self.position_1.x
+        dy = self.position_2.y - self.position_1.y
+        if -1 <= dx <= 1 and -1 <= dy <= 1:
+            return (((((self.time << COORDINATE_BITS) | self.position_1.x)
+                      << COORDINATE_BITS) | self.position_1.y) << 4) | \
+                ((dx + 1) * 3 + dy + 1)
+        return hash((self.time, self.position_1, self.position_2))
 
     def __str__(
             self) -> str:
@@ -6,67 +6,110 @@ from edge_constraint import EdgeConstraint
 from constraints import Constraints
 from conflict import Conflict
 from itertools import combinations
-from math import fabs
+from collections import OrderedDict
+from copy import copy
+from hashlib import blake2b
 from a_star import AStar
+from reservation_table import ReservationTable
+from heuristic import UNREACHABLE, distance_map_cache
+from vectorized_conflicts import find_conflicts
+
+# Grid tables of the maps environments were last created on, keyed by map
+# fingerprint, least recently used first, see Environment.make_grid
+grid_cache = OrderedDict()
 
 
 class Environment:
     """
     Orchestration of CBS happens here.
     """
+    # From this many agents on, conflicts are detected on a NumPy path matrix
+    # instead of pair by pair, see vectorized_conflicts.py
+    VECTORIZED_CONFLICTS_MIN_AGENTS = 8
+    # Number of maps whose grid tables are kept in grid_cache
+    GRID_CACHE_SIZE = 16
 
     def __init__(
             self,
-            env_dict: dict) -> None:
+            env_dict: dict,
+            tie_breaking: str = AStar.LARGER_G,
+            time_horizon: int = None,
+            max_expansions: int = None) -> None:
+        """
+        :param env_dict: The map and agents, see main.py
+        :param tie_breaking: Tie-breaking rule of the low-level search
+        :param time_horizon: Latest time step a low-level path may reach,
+                                None to derive it from the constraints
+        :param max_expansions: Expansion budget of one low-level search,
+                                None for no limit
+        """
         self.dimension = env_dict['dimensions']
         self.obstacles = env_dict['obstacles']
 
+        # Flat, row-major tables over the cells of the grid, see make_grid
+        self.num_cells = 0
+        self.num_free_cells = 0
+        self.free_cells = bytearray()
+        self.cell_positions = []
+        self.neighbor_table = []
+        # Identifies the map, independently of the agents on it
+        self.map_fingerprint = None
+
+        self.make_grid()
+
         self.agents = env_dict['agents']
         self.agent_dict = {}
+        # Exact distance to the goal of each agent, indexed by cell
+        self.distance_maps = {}
 
         self.make_agent_dict()
 
         self.constraints = Constraints()
         self.constraint_dict = {}
+        # self.constraints compiled for the low-level search
+        self.reservation_table = ReservationTable(self.num_cells)
+
+        # Conflict avoidance table: the space-time occupancy of the other
+        # agents' current paths, used by the low-level search to break ties
+        # towards fewer conflicts
+        self.cat_vertices = {}
+        self.cat_edges = {}
+        self.cat_parked = {}
 
-        self.a_star = AStar(self)
+        self.time_horizon = time_horizon
+        self.a_star = AStar(self, tie_breaking, max_expansions)
 
     def get_neighbors(
             self,
             state: State) -> list:
         """
         Extract neighbours valid for the next move. The valid moves include
-        wait, up, down, left and right
+        wait, up, down, left and right. Moves into obstacles or off the grid
+        are already excluded from the neighbor table, and the agent's
+        constraints are checked against the reservation table.
 
         :param state: The current state of the agent
         :returns: A list of neighbours valid for the next move
         """
 
         neighbors = []
-        # Wait action
-        n = State(state.time + 1, state.position)
-        if self.is_state_valid(n):
-            neighbors.append(n)
-        # Up action
-        n = State(state.time + 1, Position(state.position.x,
-                                           state.position.y + 1))
-        if self.is_state_valid(n) and self.is_transition_valid(state, n):
-            neighbors.append(n)
-        # Down action
-        n = State(state.time + 1, Position(state.position.x,
-                                           state.position.y - 1))
-        if self.is_state_valid(n) and self.is_transition_valid(state, n):
-            neighbors.append(n)
-        # Left action
-        n = State(state.time + 1, Position(state.position.x - 1,
-                                           state.position.y))
-        if self.is_state_valid(n) and self.is_transition_valid(state, n):
-            neighbors.append(n)
-        # Right action
-        n = State(state.time + 1, Position(state.position.x + 1,
-                                           state.position.y))
-        if self.is_state_valid(n) and self.is_transition_valid(state, n):
-            neighbors.append(n)
+        time = state.time + 1
+        cell = self.cell_index(state.position)
+        blocked_cells = self.reservation_table.vertices.get(time, ())
+        blocked_moves = self.reservation_table.edges.get(state.time, ())
+        required_cell = self.reservation_table.required.get(time)
+        parked = self.reservation_table.parked
+        for next_cell, next_position in self.neighbor_table[cell]:
+            if next_cell in blocked_cells:
+                continue
+            if required_cell is not None and next_cell != required_cell:
+                continue
+            if parked and time >= parked.get(next_cell, time + 1):
+                continue
+            if blocked_moves and \
+                    cell * self.num_cells + next_cell in blocked_moves:
+                continue
+            neighbors.append(State(time, next_position))
         return neighbors
 
     def get_first_conflict(
@@ -79,23 +122,54 @@ class Environment:
         :returns: An object of type Conflict, containing the first conflict
                     found
         """
+        if len(solution) >= self.VECTORIZED_CONFLICTS_MIN_AGENTS:
+            conflicts = find_conflicts(solution, first_only=True)
+            return conflicts[0] if conflicts else None
+        return next(self.iter_conflicts(solution), None)
+
+    def get_all_conflicts(
+            self,
+            solution) -> list:
+        """
+        Extract every conflict that exists in the plans, ordered by time.
+        Vertex conflicts come before edge conflicts of the same time step, so
+        the first entry is the one get_first_conflict returns. An edge
+        conflict needs the agents to swap cells; two agents staying on the
+        same cell only make vertex conflicts.
+
+        :param solution: Complete solution containing plans for each agent
+        :returns: A list of Conflict objects
+        """
+        if len(solution) >= self.VECTORIZED_CONFLICTS_MIN_AGENTS:
+            return find_conflicts(solution)
+        return list(self.iter_conflicts(solution))
+
+    def iter_conflicts(
+            self,
+            solution):
+        """
+        Lazily generates the conflicts in the plans, in the order described
+        in get_all_conflicts
+
+        :param solution: Complete solution containing plans for each agent
+        """
         max_t = max([len(plan) for plan in solution.values()])
-        result = Conflict()
 
         for t in range(max_t):
-            # Identify a vertex conflict
+            # Identify vertex conflicts
             for agent_1, agent_2 in combinations(solution.keys(), 2):
                 state_1 = self.get_state(agent_1, solution, t)
                 state_2 = self.get_state(agent_2, solution, t)
                 if state_1.is_equal_except_time(state_2):
+                    result = Conflict()
                     result.time = t
                     result.conflict_type = Conflict.VERTEX
                     result.position_1 = state_1.position
                     result.agent_1 = agent_1
                     result.agent_2 = agent_2
-                    return result
+                    yield result
 
-            # Identify an edge conflict
+            # Identify edge conflicts
             for agent_1, agent_2 in combinations(solution.keys(), 2):
                 state_1a = self.get_state(agent_1, solution, t)
                 state_1b = self.get_state(agent_1, solution, t + 1)
@@ -104,15 +178,17 @@ class Environment:
                 state_2b = self.get_state(agent_2, solution, t + 1)
 
                 if state_1a.is_equal_except_time(
-                        state_2b) and state_1b.is_equal_except_time(state_2a):
+                        state_2b) and state_1b.is_equal_except_time(
+                        state_2a) and not state_1a.is_equal_except_time(
+                        state_1b):
+                    result = Conflict()
                     result.time = t
                     result.conflict_type = Conflict.EDGE
                     result.agent_1 = agent_1
                     result.agent_2 = agent_2
                     result.position_1 = state_1a.position
                     result.position_2 = state_1b.position
-                    return result
-        return None
+                    yield result
 
     def create_constraints_from_conflict(
             self,
@@ -148,6 +224,73 @@ class Environment:
 
         return constraint_dict
 
+    def create_disjoint_constraints_from_conflict(
+            self,
+            conflict: Conflict) -> list:
+        """
+        Creates the constraints of disjoint splitting: agent_1 must be at
+        the conflicting position (or make the conflicting move) in one child
+        and must not in the other. The positive constraint implies negative
+        ones for every other agent, see Constraints.implied_constraints, so
+        no solution is shared by both children.
+
+        :param conflict: The conflict that has been identified
+        :returns: A list of two (agent, Constraints) pairs, the positive
+                    child first
+        """
+        positive = Constraints()
+        negative = Constraints()
+        if conflict.conflict_type == Conflict.VERTEX:
+            v_constraint = VertexConstraint(conflict.time, conflict.position_1)
+            positive.positive_vertex_constraints.add(v_constraint)
+            negative.vertex_constraints.add(v_constraint)
+
+        elif conflict.conflict_type == Conflict.EDGE:
+            e_constraint = EdgeConstraint(conflict.time, conflict.position_1,
+                                          conflict.position_2)
+            positive.positive_edge_constraints.add(e_constraint)
+            negative.edge_constraints.add(e_constraint)
+
+        return [(conflict.agent_1, positive), (conflict.agent_1, negative)]
+
+    def violates_constraints(
+            self,
+            path: list,
+            constraints: Constraints) -> bool:
+        """
+        Checks if a path breaks any of the constraints, the agent staying at
+        the end of its path once it has been reached
+
+        :param path: The path of an agent, a list of States
+        :param constraints: Its constraints
+        :returns: bool, whether a constraint is broken
+        """
+        def position_at(t):
+            return path[min(t, len(path) - 1)].position
+
+        for vertex_constraint in constraints.vertex_constraints:
+            if position_at(vertex_constraint.time) == \
+                    vertex_constraint.position:
+                return True
+        for edge_constraint in constraints.edge_constraints:
+            if edge_constraint.time < len(path) - 1 and \
+                    position_at(edge_constraint.time) == \
+                    edge_constraint.position_1 and \
+                    position_at(edge_constraint.time + 1) == \
+                    edge_constraint.position_2:
+                return True
+        for vertex_constraint in constraints.positive_vertex_constraints:
+            if position_at(vertex_constraint.time) != \
+                    vertex_constraint.position:
+                return True
+        for edge_constraint in constraints.positive_edge_constraints:
+            if position_at(edge_constraint.time) != \
+                    edge_constraint.position_1 or \
+                    position_at(edge_constraint.time + 1) != \
+                    edge_constraint.position_2:
+                return True
+        return False
+
     def get_state(
             self,
             agent_name,
@@ -166,10 +309,27 @@ class Environment:
         :param state: State to be checked
         :returns: bool, whether the state is valid or not
         """
-        return state.position.x >= 0 and state.position.x < self.dimension[0] \
-               and state.position.y >= 0 and state.position.y < self.dimension[1] \
-               and VertexConstraint(state.time, state.position) not in self.constraints.vertex_constraints \
-               and (state.position.x, state.position.y) not in self.obstacles
+        return self.is_cell_free(state.position) \
+               and not self.reservation_table.is_cell_blocked(
+                   state.time, self.cell_index(state.position))
+
+    def cell_index(
+            self,
+            position: Position) -> int:
+        """
+        Index of a position in the flat grid tables
+        """
+        return position.x * self.dimension[1] + position.y
+
+    def is_cell_free(
+            self,
+            position: Position) -> bool:
+        """
+        Checks if a position is on the grid and not an obstacle
+        """
+        return 0 <= position.x < self.dimension[0] and \
+            0 <= position.y < self.dimension[1] and \
+            self.free_cells[self.cell_index(position)] == 1
 
     def is_transition_valid(
             self,
@@ -181,8 +341,56 @@ class Environment:
         :param state_2: State to be checked
         :returns: bool, whether the state is valid or not
         """
-        return EdgeConstraint(state_1.time, state_1.position,
-                              state_2.position) not in self.constraints.edge_constraints
+        return not self.reservation_table.is_move_blocked(
+            state_1.time, self.cell_index(state_1.position),
+            self.cell_index(state_2.position))
+
+    def build_conflict_avoidance_table(
+            self,
+            solution: dict,
+            agent_name) -> None:
+        """
+        Records where every agent other than agent_name is planned to be, so
+        that count_conflicts can be answered with dictionary lookups
+
+        :param solution: Paths planned so far, keyed by agent name
+        :param agent_name: The agent about to be planned
+        """
+        self.cat_vertices = {}
+        self.cat_edges = {}
+        self.cat_parked = {}
+        for other_agent, path in solution.items():
+            if other_agent == agent_name:
+                continue
+            for state in path:
+                self.cat_vertices[state] = self.cat_vertices.get(state, 0) + 1
+            for state_1, state_2 in zip(path[:-1], path[1:]):
+                # Stored reversed, as the move that would swap with this one
+                swap = EdgeConstraint(state_1.time, state_2.position,
+                                      state_1.position)
+                self.cat_edges[swap] = self.cat_edges.get(swap, 0) + 1
+            goal = path[-1]
+            self.cat_parked.setdefault(goal.position, []).append(goal.time)
+
+    def count_conflicts(
+            self,
+            state_1: State,
+            state_2: State) -> int:
+        """
+        Counts the conflicts of the move state_1 -> state_2 with the paths in
+        the conflict avoidance table
+
+        :param state_1: State the move starts from
+        :param state_2: State the move ends in
+        :returns: The number of vertex and edge conflicts caused by the move
+        """
+        conflicts = self.cat_vertices.get(state_2, 0) + self.cat_edges.get(
+            EdgeConstraint(state_1.time, state_1.position, state_2.position), 0)
+        # Agents that finished their path keep occupying their goal
+        for goal_time in self.cat_parked.get(state_2.position, ()):
+            if state_2.time > goal_time:
+                conflicts += 1
+        return conflicts
 
     def is_solution(self, agent_name):
         pass
@@ -190,34 +398,203 @@ class Environment:
     def admissible_heuristic(
             self,
             state,
-            agent_name):
-        goal = self.agent_dict[agent_name]["goal"]
-        return fabs(state.position.x - goal.position.x) + \
-               fabs(state.position.y - goal.position.y)
+            agent_name) -> int:
+        """
+        Exact distance from the state's cell to the agent's goal, ignoring
+        the other agents, raised to the wait until the agent may stay at its
+        goal for good, see is_at_goal. Both terms fall by at most one per
+        move, so the heuristic stays consistent. Returns UNREACHABLE if the
+        goal cannot be reached.
+        """
+        distance = self.distance_maps[agent_name][
+            self.cell_index(state.position)]
+        goal_time = self.reservation_table.latest_vertex_time.get(
+            self.cell_index(self.agent_dict[agent_name]["goal"].position))
+        if goal_time is None or distance == UNREACHABLE:
+            return distance
+        return max(distance, goal_time + 1 - state.time)
 
     def is_at_goal(
             self,
             state: State,
             agent_name) -> bool:
+        """
+        Checks if the agent can stop at this state for good, i.e. it is at
+        its goal, no later vertex constraint forbids it to stay there and no
+        later positive constraint requires it elsewhere
+        """
         goal_state = self.agent_dict[agent_name]["goal"]
-        return state.is_equal_except_time(goal_state)
+        if not state.is_equal_except_time(goal_state):
+            return False
+        goal_cell = self.cell_index(goal_state.position)
+        return state.time > self.reservation_table.latest_vertex_time.get(
+            goal_cell, -1) and \
+            not self.reservation_table.requires_other_cell_after(state.time,
+                                                                goal_cell)
+
+    def get_time_horizon(self) -> int:
+        """
+        Latest time step the low-level search may plan to. Unless configured,
+        it is derived from the constraints: once they have all expired, a
+        shortest path cannot visit more states than there are free cells, so
+        every agent that can reach its goal does so within the horizon.
+        """
+        if self.time_horizon is not None:
+            return self.time_horizon
+        return self.reservation_table.latest_time + 1 + self.num_free_cells
+
+    def get_latest_constraint_time(self) -> int:
+        """
+        Latest time step at which a constraint of the agent being planned
+        applies, -1 if there is none. Past it, states on the same cell only
+        differ by their time.
+        """
+        return self.reservation_table.latest_time
+
+    def make_grid(self):
+        """
+        Precomputes, once per environment, the flat tables used by the
+        low-level search:
+        - free_cells, a bitmap holding 1 for every cell that is not an obstacle
+        - cell_positions, one shared Position object per cell
+        - neighbor_table, for every free cell the (cell index, position) pairs
+          reachable in one step, in the order wait, up, down, left, right
+        The last two are only read afterwards, so they are shared between
+        the environments created on the same map through grid_cache.
+        """
+        rows, columns = self.dimension
+        self.num_cells = rows * columns
+        self.free_cells = bytearray([1]) * self.num_cells
+        for x, y in self.obstacles:
+            self.free_cells[x * columns + y] = 0
+        self.num_free_cells = sum(self.free_cells)
+        self.map_fingerprint = (rows, columns, blake2b(
+            self.free_cells, digest_size=16).hexdigest())
+
+        tables = grid_cache.get(self.map_fingerprint)
+        if tables is not None:
+            grid_cache.move_to_end(self.map_fingerprint)
+            self.cell_positions, self.neighbor_table = tables
+            return
+
+        self.cell_positions = [Position(x, y) for x in range(rows)
+                               for y in range(columns)]
+
+        self.neighbor_table = [()] * self.num_cells
+        for index, position in enumerate(self.cell_positions):
+            if not self.free_cells[index]:
+                continue
+            x, y = position.x, position.y
+            self.neighbor_table[index] = tuple(
+                (nx * columns + ny, self.cell_positions[nx * columns + ny])
+                for nx, ny in ((x, y), (x, y + 1), (x, y - 1), (x - 1, y),
+                               (x + 1, y))
+                if 0 <= nx < rows and 0 <= ny < columns and
+                self.free_cells[nx * columns + ny])
+
+        grid_cache[self.map_fingerprint] = (self.cell_positions,
+                                            self.neighbor_table)
+        while len(grid_cache) > self.GRID_CACHE_SIZE:
+            grid_cache.popitem(last=False)
 
     def make_agent_dict(self):
         for agent in self.agents:
-            start_state = State(0, Position(agent['start'][0], agent['start'][1]))
-            goal_state = State(0, Position(agent['goal'][0], agent['goal'][1]))
+            start_state = State(0, self.free_position(agent, 'start'))
+            goal_state = State(0, self.free_position(agent, 'goal'))
             self.agent_dict.update({agent['name']: {'start': start_state, 'goal': goal_state}})
+            self.distance_maps[agent['name']] = distance_map_cache.get(
+                self, self.cell_index(goal_state.position))
+
+    def free_position(
+            self,
+            agent: dict,
+            key: str) -> Position:
+        """
+        :param agent: An agent of the env_dict
+        :param key: 'start' or 'goal'
+        :returns: The shared Position of the agent's start or goal
+        :raises ValueError: If it is off the grid or an obstacle
+        """
+        x, y = agent[key]
+        rows, columns = self.dimension
+        if not (0 <= x < rows and 0 <= y < columns):
+            raise ValueError("The {} {} of agent {} is off the {}x{} "
+                             "grid".format(key, (x, y), agent['name'], rows,
+                                           columns))
+        cell = x * columns + y
+        if not self.free_cells[cell]:
+            raise ValueError("The {} {} of agent {} is an obstacle".format(
+                key, (x, y), agent['name']))
+        return self.cell_positions[cell]
+
+    def to_env_dict(self) -> dict:
+        """
+        The map and agents in the format the environment was created from
+        """
+        return {'dimensions': self.dimension, 'obstacles': self.obstacles,
+                'agents': self.agents}
+
+    def subset(
+            self,
+            agent_names: list) -> Environment:
+        """
+        Creates an environment holding only some of the agents. The grid
+        tables and distance maps are shared, not rebuilt.
+
+        :param agent_names: The agents to keep
+        :returns: A new Environment
+        """
+        environment = copy(self)
+        environment.agents = [agent for agent in self.agents
+                              if agent['name'] in agent_names]
+        environment.agent_dict = {name: self.agent_dict[name]
+                                  for name in agent_names}
+        environment.distance_maps = {name: self.distance_maps[name]
+                                     for name in agent_names}
+        environment.constraints = Constraints()
+        environment.constraint_dict = {}
+        environment.reservation_table = ReservationTable(self.num_cells)
+        environment.cat_vertices = {}
+        environment.cat_edges = {}
+        environment.cat_parked = {}
+        environment.a_star = AStar(environment, self.a_star.tie_breaking,
+                                   self.a_star.max_expansions)
+        return environment
 
     def compute_solution(self):
         solution = {}
         for agent in self.agent_dict.keys():
-            self.constraints = self.constraint_dict.setdefault(agent, Constraints())
-            local_solution = self.a_star.search(agent)
+            local_solution = self.compute_agent_solution(agent, solution)
             if not local_solution:
                 return False
             solution.update({agent: local_solution})
         return solution
 
+    def compute_agent_solution(
+            self,
+            agent_name,
+            solution: dict,
+            a_star: AStar = None):
+        """
+        Plans a single agent under its constraints in constraint_dict
+
+        :param agent_name: The agent to plan
+        :param solution: The paths of the other agents, used for tie-breaking
+                            towards fewer conflicts
+        :param a_star: The low-level search to run, by default this
+                        environment's AStar
+        :returns: The path of the agent, False if none exists
+        """
+        if a_star is None:
+            a_star = self.a_star
+        self.constraints = self.constraint_dict.setdefault(agent_name,
+                                                           Constraints())
+        self.reservation_table = ReservationTable.from_constraints(
+            self.constraints, self)
+        if a_star.tie_breaking == AStar.FEWEST_CONFLICTS:
+            self.build_conflict_avoidance_table(solution, agent_name)
+        return a_star.search(agent_name)
+
     def compute_solution_cost(
             self,
             solution):
@@ -0,0 +1,125 @@
+from __future__ import annotations
+from heapq import heappush, heappop
+from itertools import count
+from a_star import AStar
+from heuristic import UNREACHABLE
+
+
+class FocalSearch(AStar):
+    """
+    Bounded-suboptimal low-level search. Among the open states whose f-score
+    is within suboptimality times the smallest open f-score, the focal
+    states, it expands the one whose path has the fewest conflicts with the
+    other agents' paths (the conflict avoidance table of the Environment).
+    The returned path is at most suboptimality times longer than a shortest
+    one, and lower_bound is set to a lower bound on that shortest length.
+
+    A state's g-score is its time, so its f-score never changes and the open
+    states are kept in buckets by f-score.
+    """
+    def __init__(
+            self,
+            env,
+            suboptimality: float,
+            max_expansions: int = None) -> None:
+        """
+        :param env: The Environment to search in
+        :param suboptimality: Factor w >= 1 bounding the path length
+        :param max_expansions: Expansion budget of one search, None for no
+                                limit
+        """
+        # Conflicts are counted with the conflict avoidance table, which the
+        # Environment only builds for this tie-breaking rule
+        super().__init__(env, AStar.FEWEST_CONFLICTS, max_expansions)
+        if suboptimality < 1:
+            raise ValueError("Suboptimality must be at least 1: " +
+                             str(suboptimality))
+        self.suboptimality = suboptimality
+        # Lower bound on the length, in states, of the agent's shortest path
+        # found by the last successful search
+        self.lower_bound = 0
+
+    def search(self, agent_name):
+        """
+        low level focal search
+
+        :param agent_name: The agent to plan
+        :returns: The path of the agent, False if none is found within the
+                    time horizon and the expansion budget
+        """
+        initial_state = self.agent_dict[agent_name]["start"]
+        time_horizon = self.get_time_horizon()
+        expansions_left = self.max_expansions
+        suboptimality = self.suboptimality
+
+        h = self.admissible_heuristic(initial_state, agent_name)
+        if h == UNREACHABLE:
+            return False
+        closed_set = set()
+        came_from = {}
+        conflict_score = {initial_state: 0}
+        # Open states by f-score, and a heap of the f-scores with open states
+        open_buckets = {h: {initial_state}}
+        f_heap = [h]
+        f_min = h
+        # Binary heap of (conflicts, f, -g, tie, state) entries over the focal
+        # states, stale entries are skipped when popped
+        focal_heap = []
+        tie = count()
+        heappush(focal_heap, (0, h, 0, next(tie), initial_state))
+
+        while True:
+            while f_heap and not open_buckets[f_heap[0]]:
+                del open_buckets[heappop(f_heap)]
+            if not f_heap:
+                return False
+            if f_heap[0] > f_min:
+                # States the raised bound brings into focal
+                for f in range(int(f_min * suboptimality) + 1,
+                               int(f_heap[0] * suboptimality) + 1):
+                    for state in open_buckets.get(f, ()):
+                        heappush(focal_heap, (conflict_score[state], f,
+                                              -state.time, next(tie), state))
+                f_min = f_heap[0]
+            bound = int(f_min * suboptimality)
+
+            conflicts, f, _, _, current = heappop(focal_heap)
+            if current in closed_set or conflicts > conflict_score[current]:
+                continue
+            open_buckets[f].discard(current)
+
+            if self.is_at_goal(current, agent_name):
+                self.lower_bound = f_min + 1
+                return self.reconstruct_path(came_from, current)
+            if expansions_left is not None:
+                if expansions_left == 0:
+                    return False
+                expansions_left -= 1
+            closed_set.add(current)
+            self.num_expansions += 1
+            if current.time >= time_horizon:
+                continue
+
+            for neighbor in self.get_neighbors(current):
+                if neighbor in closed_set:
+                    continue
+                neighbor_conflicts = conflicts + self.count_conflicts(
+                    current, neighbor)
+                known_conflicts = conflict_score.get(neighbor)
+                # Every path to a state is equally long, keep the least
+                # conflicting one
+                if known_conflicts is not None and \
+                        neighbor_conflicts >= known_conflicts:
+                    continue
+                conflict_score[neighbor] = neighbor_conflicts
+                came_from[neighbor] = current
+                neighbor_f = neighbor.time + self.admissible_heuristic(
+                    neighbor, agent_name)
+                if known_conflicts is None:
+                    if neighbor_f not in open_buckets:
+                        open_buckets[neighbor_f] = set()
+                        heappush(f_heap, neighbor_f)
+                    open_buckets[neighbor_f].add(neighbor)
+                if neighbor_f <= bound:
+                    heappush(focal_heap, (neighbor_conflicts, neighbor_f,
+                                          -neighbor.time, next(tie), neighbor))
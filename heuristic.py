@@ -0,0 +1,86 @@
+from __future__ import annotations
+from array import array
+from collections import OrderedDict, deque
+
+# Distance stored for the cells from which the goal cannot be reached
+UNREACHABLE = -1
+
+
+def compute_distance_map(
+        environment,
+        goal_cell: int) -> array:
+    """
+    Computes the exact, obstacle-aware distance from every cell to a goal
+    cell with a breadth-first search backwards from the goal. Moves are
+    reversible on the grid, so the neighbor table serves both directions.
+
+    :param environment: The Environment whose grid tables are used
+    :param goal_cell: Flat index of the goal cell
+    :returns: An array of distances indexed by cell, UNREACHABLE for cells
+                that are obstacles or not connected to the goal
+    """
+    distances = array('i', [UNREACHABLE]) * environment.num_cells
+    distances[goal_cell] = 0
+    frontier = deque([goal_cell])
+    neighbor_table = environment.neighbor_table
+    while frontier:
+        cell = frontier.popleft()
+        next_distance = distances[cell] + 1
+        for next_cell, _ in neighbor_table[cell]:
+            if distances[next_cell] == UNREACHABLE:
+                distances[next_cell] = next_distance
+                frontier.append(next_cell)
+    return distances
+
+
+class DistanceMapCache:
+    """
+    Least-recently-used cache of distance maps, keyed by the fingerprint of
+    the map and the goal cell. The cache is bounded by the total size of the
+    stored arrays rather than by their number, since a map's size varies by
+    orders of magnitude between instances.
+    """
+    def __init__(
+            self,
+            max_bytes: int = 256 * 2 ** 20) -> None:
+        self.max_bytes = max_bytes
+        self.num_bytes = 0
+        self.distance_maps = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get(
+            self,
+            environment,
+            goal_cell: int) -> array:
+        """
+        Returns the distance map towards goal_cell, computing it on a miss
+
+        :param environment: The Environment the goal cell belongs to
+        :param goal_cell: Flat index of the goal cell
+        :returns: An array of distances indexed by cell
+        """
+        key = (environment.map_fingerprint, goal_cell)
+        distances = self.distance_maps.get(key)
+        if distances is not None:
+            self.hits += 1
+            self.distance_maps.move_to_end(key)
+            return distances
+
+        self.misses += 1
+        distances = compute_distance_map(environment, goal_cell)
+        self.distance_maps[key] = distances
+        self.num_bytes += distances.itemsize * len(distances)
+        while self.num_bytes > self.max_bytes and len(self.distance_maps) > 1:
+            _, evicted = self.distance_maps.popitem(last=False)
+            self.num_bytes -= evicted.itemsize * len(evicted)
+        return distances
+
+    def clear(self) -> None:
+        self.distance_maps.clear()
+        self.num_bytes = 0
+
+
+# Shared by all environments, so that distance maps are reused across CBS
+# runs on the same map
+distance_map_cache = DistanceMapCache()
@@ -0,0 +1,247 @@
+from __future__ import annotations
+from conflict import Conflict
+
+
+class HighLevelHeuristic:
+    """
+    Admissible estimate of how much the cost of a constraint tree node must
+    still grow before its conflicts are resolved. CBS orders its open list
+    by cost + h. This base class is the zero heuristic, plain CBS.
+
+    The subclasses build a graph over the agents, with an edge between two
+    agents when resolving their conflicts costs at least the edge weight,
+    and return the minimum vertex cover of that graph, which is a lower
+    bound on the total cost increase.
+    """
+    def compute(
+            self,
+            cbs,
+            node) -> int:
+        """
+        :param cbs: The CBS instance the node belongs to
+        :param node: The node to estimate, with its conflict index computed
+        :returns: A non-negative integer lower bound
+        """
+        return 0
+
+    @staticmethod
+    def conflicting_pairs(
+            node) -> dict:
+        """
+        :returns: {(agent_1, agent_2): [conflicts]} over the node's conflicts
+        """
+        pairs = {}
+        for conflict in node.conflict_index.conflicts.values():
+            pairs.setdefault((conflict.agent_1, conflict.agent_2),
+                             []).append(conflict)
+        return pairs
+
+
+class ConflictGraphHeuristic(HighLevelHeuristic):
+    """
+    CG: two agents are joined when they have a cardinal conflict, since
+    resolving it makes at least one of them one step longer.
+    """
+    def compute(
+            self,
+            cbs,
+            node) -> int:
+        edges = {}
+        for pair, conflicts in self.conflicting_pairs(node).items():
+            if any(cbs.classify_conflict(node, conflict) == Conflict.CARDINAL
+                   for conflict in conflicts):
+                edges[pair] = 1
+        return minimum_vertex_cover(edges)
+
+
+class DependencyGraphHeuristic(HighLevelHeuristic):
+    """
+    DG: two conflicting agents are joined when no pair of their shortest
+    paths is conflict-free, i.e. their joint MDD is empty. Dependencies are
+    memoized on the two agents' constraints and costs, which many nodes
+    share.
+    """
+    def __init__(self) -> None:
+        self.memo = {}
+
+    def compute(
+            self,
+            cbs,
+            node) -> int:
+        edges = {}
+        for agent_1, agent_2 in self.conflicting_pairs(node):
+            weight = self.pair_weight(cbs, node, agent_1, agent_2)
+            if weight > 0:
+                edges[(agent_1, agent_2)] = weight
+        return minimum_vertex_cover(edges)
+
+    def pair_weight(
+            self,
+            cbs,
+            node,
+            agent_1,
+            agent_2) -> int:
+        key = (cbs.agent_key(node, agent_1), cbs.agent_key(node, agent_2))
+        weight = self.memo.get(key)
+        if weight is None:
+            weight = self.compute_pair_weight(cbs, node, agent_1, agent_2)
+            self.memo[key] = weight
+        return weight
+
+    def compute_pair_weight(
+            self,
+            cbs,
+            node,
+            agent_1,
+            agent_2) -> int:
+        return int(is_dependent(cbs.get_mdd(node, agent_1),
+                                cbs.get_mdd(node, agent_2)))
+
+
+class WeightedDependencyGraphHeuristic(DependencyGraphHeuristic):
+    """
+    WDG: dependent agents are joined with the exact extra cost of solving
+    them together, found by running CBS on the two agents alone under their
+    current constraints. When that sub-search exceeds its node limit the
+    DG weight of 1 is used, which keeps the estimate admissible.
+    """
+    def __init__(
+            self,
+            node_limit: int = 50) -> None:
+        super().__init__()
+        self.node_limit = node_limit
+
+    def compute_pair_weight(
+            self,
+            cbs,
+            node,
+            agent_1,
+            agent_2) -> int:
+        if not super().compute_pair_weight(cbs, node, agent_1, agent_2):
+            return 0
+        # Imported here, CBS imports this module
+        from cbs import CBS
+        pair_cbs = CBS(cbs.env.subset([agent_1, agent_2]),
+                       node_limit=self.node_limit)
+        plan = pair_cbs.search(initial_constraints={
+            agent_1: node.agent_constraints(agent_1),
+            agent_2: node.agent_constraints(agent_2)})
+        if not plan:
+            return 1
+        pair_cost = sum(len(path) for path in plan.values())
+        return max(1, pair_cost - len(node.solution[agent_1]) -
+                   len(node.solution[agent_2]))
+
+
+def is_dependent(
+        mdd_1,
+        mdd_2) -> bool:
+    """
+    Searches the joint MDD of two agents level by level for a pair of
+    shortest paths without a vertex or edge conflict
+
+    :returns: True if every pair of shortest paths conflicts
+    """
+    start_1, = mdd_1.levels[0]
+    start_2, = mdd_2.levels[0]
+    frontier = {(start_1, start_2)} if start_1 != start_2 else set()
+    depth = max(len(mdd_1.levels), len(mdd_2.levels)) - 1
+    for t in range(depth):
+        following = set()
+        for cell_1, cell_2 in frontier:
+            for next_1 in mdd_1.successors(t, cell_1):
+                for next_2 in mdd_2.successors(t, cell_2):
+                    if next_1 != next_2 and not (
+                            next_1 == cell_2 and next_2 == cell_1):
+                        following.add((next_1, next_2))
+        if not following:
+            return True
+        frontier = following
+    return not frontier
+
+
+def minimum_vertex_cover(
+        edges: dict,
+        exact_size: int = 12) -> int:
+    """
+    Edge-weighted minimum vertex cover: the smallest total of non-negative
+    integer vertex values x such that x[a] + x[b] >= weight for every edge
+    (a, b). With unit weights this is the plain minimum vertex cover.
+
+    Connected components with up to exact_size vertices are solved exactly
+    by branch and bound. Larger components fall back to the total weight of
+    a greedy matching, a lower bound which keeps the result admissible.
+
+    :param edges: {(a, b): weight}
+    :returns: The cover value, 0 for no edges
+    """
+    adjacency = {}
+    for (a, b), weight in edges.items():
+        adjacency.setdefault(a, {})[b] = max(weight,
+                                             adjacency.get(a, {}).get(b, 0))
+        adjacency.setdefault(b, {})[a] = adjacency[a][b]
+
+    total = 0
+    seen = set()
+    for vertex in adjacency:
+        if vertex in seen:
+            continue
+        component = []
+        stack = [vertex]
+        seen.add(vertex)
+        while stack:
+            current = stack.pop()
+            component.append(current)
+            for neighbor in adjacency[current]:
+                if neighbor not in seen:
+                    seen.add(neighbor)
+                    stack.append(neighbor)
+        if len(component) <= exact_size:
+            total += _exact_cover(component, adjacency)
+        else:
+            total += _matching_bound(component, adjacency)
+    return total
+
+
+def _exact_cover(
+        component: list,
+        adjacency: dict) -> int:
+    # Most connected vertices first, they settle the most edges
+    order = sorted(component, key=lambda v: -len(adjacency[v]))
+    values = {}
+    best = [sum(max(adjacency[v].values()) for v in order)]
+
+    def branch(index, partial):
+        if partial >= best[0]:
+            return
+        if index == len(order):
+            best[0] = partial
+            return
+        vertex = order[index]
+        # Smallest value covering the edges to already valued vertices
+        low = max([weight - values[neighbor]
+                   for neighbor, weight in adjacency[vertex].items()
+                   if neighbor in values] + [0])
+        high = max(adjacency[vertex].values())
+        for value in range(low, max(low, high) + 1):
+            values[vertex] = value
+            branch(index + 1, partial + value)
+        del values[vertex]
+
+    branch(0, 0)
+    return best[0]
+
+
+def _matching_bound(
+        component: list,
+        adjacency: dict) -> int:
+    edges = sorted(((weight, a, b) for a in component
+                    for b, weight in adjacency[a].items() if a < b),
+                   reverse=True)
+    matched = set()
+    bound = 0
+    for weight, a, b in edges:
+        if a not in matched and b not in matched:
+            matched.update((a, b))
+            bound += weight
+    return bound
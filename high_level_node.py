@@ -1,28 +1,99 @@
 from __future__ import annotations
+from constraints import Constraints
 
 
 class HighLevelNode:
     """
-    Root node for CBS
+    Node of the CBS constraint tree. A node is immutable once generated: it
+    only stores the constraint it adds on top of its parent's constraints,
+    and shares the paths of the agents it does not replan with its parent.
     """
-    def __init__(self) -> None:
-        self.solution = {}
-        self.constraint_dict = {}
-        self.cost = 0
+    FINGERPRINT_MODULUS = 2 ** 64
+
+    def __init__(
+            self,
+            parent: HighLevelNode = None,
+            agent=None,
+            constraint: Constraints = None) -> None:
+        self.parent = parent
+        # The agent constrained by this node and the constraint added to it,
+        # both None for the root
+        self.agent = agent
+        self.constraint = constraint
+        # The negative constraints a positive constraint puts on the other
+        # agents, None if the constraint is negative
+        self.implied_constraints = constraint.implied_constraints() \
+            if constraint is not None and \
+            constraint.has_positive_constraints() else None
+
+        # Constraints every node of the tree starts from, shared with the
+        # root, see CBS.search
+        self.initial_constraints = parent.initial_constraints if parent \
+            else {}
+
+        # The solution dict is copied, the paths in it are shared
+        self.solution = dict(parent.solution) if parent else {}
+        self.cost = parent.cost if parent else 0
+        # Lower bounds of the agents' path costs and their sum, only kept by
+        # the bounded-suboptimal search, see ecbs.py
+        self.lower_bounds = dict(parent.lower_bounds) if parent else {}
+        self.lower_bound = parent.lower_bound if parent else 0
+        # Lower bound of the cost still to add, see high_level_heuristic.py
+        self.h = 0
+        # Number of conflicts in the solution, the secondary ordering key
+        self.num_conflicts = 0
+        # First conflict of the solution, None if the solution is conflict-free
+        self.conflict = None
+        # All conflicts of the solution, a ConflictIndex
+        self.conflict_index = None
+        # Order of generation, the final tie-breaker of the ordering
+        self.node_id = 0
+
+        # Order-independent hash of the whole constraint set, built
+        # incrementally from the parent's so that duplicate nodes can be
+        # identified without walking or comparing the constraint sets
+        self.fingerprint = parent.fingerprint if parent else 0
+        if constraint is not None:
+            self.fingerprint = (self.fingerprint + hash(
+                (agent, str(constraint)))) % HighLevelNode.FINGERPRINT_MODULUS
+
+    def agent_constraints(
+            self,
+            agent) -> Constraints:
+        """
+        Collects all the constraints on an agent along the path to the root,
+        including the negative constraints implied by the positive
+        constraints of the other agents
+
+        :param agent: The agent whose constraints are requested
+        :returns: A new Constraints object
+        """
+        constraints = Constraints()
+        if agent in self.initial_constraints:
+            constraints.add_constraint(self.initial_constraints[agent])
+        node = self
+        while node is not None:
+            if node.agent == agent:
+                constraints.add_constraint(node.constraint)
+            elif node.implied_constraints is not None:
+                constraints.add_constraint(node.implied_constraints)
+            node = node.parent
+        return constraints
 
     def __eq__(
             self,
             other: HighLevelNode) -> bool:
         if not isinstance(other, type(self)):
             return NotImplemented
-        return self.solution == other.solution and self.cost == other.cost
+        return self.fingerprint == other.fingerprint
 
     def __hash__(
             self) -> hash:
         """Added to make this class hashable"""
-        return hash(self.cost)
+        return self.fingerprint
 
     def __lt__(       # Less than
             self,
             other: HighLevelNode):
-        return self.cost < other.cost
+        return (self.cost + self.h, self.num_conflicts, self.node_id) < \
+            (other.cost + other.h, other.num_conflicts, other.node_id)
@@ -0,0 +1,274 @@
+from __future__ import annotations
+from collections import deque
+
+from cbs import CBS
+from conflict import Conflict
+from ecbs import ECBS
+from constraints import Constraints
+from environment import Environment
+from heuristic import UNREACHABLE
+from position import Position
+from state import State
+from vertex_constraint import VertexConstraint
+
+
+class LifelongPlanner:
+    """
+    Long-lived planner for agents that keep receiving new goals, with
+    rolling-horizon collision resolution. A replanning runs CBS from the
+    agents' current positions, resolving the conflicts of the next window
+    steps only, and commits the next commit steps of every agent's plan. The
+    agents execute them one step() at a time, and the steps after them are
+    replanned later with the goals of that time, so the work of a replanning
+    is bounded by the window rather than by the length of the paths.
+
+    A replanning happens when the agents run out of committed steps, so new
+    goals are taken up within commit steps. A new agent has no committed steps
+    and is planned at the next step, while the steps the other agents have
+    committed are kept: they become positive constraints, so the agents still
+    make them and the new one plans around them. An agent whose goal can't be
+    reached waits after its committed steps, at the nearest cell that is no
+    other agent's goal, and is reported in unreachable until a replanning finds
+    its goal reachable. Replannings on the same map share the grid tables and
+    distance maps through the caches of environment.py and heuristic.py, and
+    the paths planned last warm start CBS or ECBS.
+    """
+    def __init__(
+            self,
+            dimensions: tuple,
+            obstacles: list,
+            window: int = 10,
+            commit: int = 5,
+            time_limit: float = 1.0,
+            node_limit: int = None,
+            suboptimality: float = None) -> None:
+        """
+        :param dimensions: (rows, columns) of the map
+        :param obstacles: (x, y) positions of the obstacles
+        :param window: Conflicts are resolved at the time steps before
+                        window, the current one being 0, see
+                        CBS.conflict_window
+        :param commit: Number of steps committed by a replanning, less than
+                        window so that every committed step is
+                        conflict-free
+        :param time_limit: Seconds given to a replanning, None for no limit
+        :param node_limit: Nodes a replanning may expand, None for no limit
+        :param suboptimality: Replan with ECBS of this suboptimality factor,
+                                None for CBS. ECBS keeps replannings fast
+                                with many agents.
+        """
+        if not 1 <= commit < window:
+            raise ValueError("commit must be at least 1 and less than window")
+        self.dimensions = tuple(dimensions)
+        self.obstacles = [tuple(obstacle) for obstacle in obstacles]
+        self.window = window
+        self.commit = commit
+        self.time_limit = time_limit
+        self.node_limit = node_limit
+        self.suboptimality = suboptimality
+        self.time = 0
+        self.goals = {}
+        # Planned positions of every agent, its current position first, and
+        # the number of them after the first that are committed
+        self.paths = {}
+        self.num_committed = {}
+        self.num_replans = 0
+        # Agents whose goal the last replanning found unreachable, they wait
+        # in place
+        self.unreachable = set()
+        # Outcome of the last replanning, a SearchResult
+        self.result = None
+
+    def add_agent(
+            self,
+            name,
+            position: tuple,
+            goal: tuple) -> None:
+        """
+        Adds an agent at a position no other agent is at now or will be at
+        during its committed steps
+        """
+        position = tuple(position)
+        if name in self.goals:
+            raise ValueError("Agent {} already exists".format(name))
+        if any(position in path
+               for path in self.committed_paths().values()):
+            raise ValueError("Position {} is taken".format(position))
+        self.goals[name] = tuple(goal)
+        self.paths[name] = [position]
+        self.num_committed[name] = 0
+
+    def remove_agent(
+            self,
+            name) -> None:
+        """
+        Removes an agent, the others keep their plans
+        """
+        del self.goals[name]
+        del self.paths[name]
+        del self.num_committed[name]
+        self.unreachable.discard(name)
+
+    def set_goal(
+            self,
+            name,
+            goal: tuple) -> None:
+        """
+        Gives an agent a new goal, it heads there after its committed steps
+        """
+        self.goals[name] = tuple(goal)
+
+    def committed_paths(self) -> dict:
+        """
+        :returns: The committed positions of every agent, from its current
+                    position on, keyed by agent name
+        """
+        return {agent: path[:1 + self.num_committed[agent]]
+                for agent, path in self.paths.items()}
+
+    def step(self) -> dict:
+        """
+        Moves every agent one step along its plan, replanning first if an
+        agent ran out of committed steps
+
+        :returns: The new position of every agent, keyed by agent name
+        """
+        if 0 in self.num_committed.values():
+            self.replan()
+        positions = {}
+        for agent, path in self.paths.items():
+            if len(path) > 1:
+                path.pop(0)
+            self.num_committed[agent] -= 1
+            positions[agent] = path[0]
+        self.time += 1
+        return positions
+
+    def replan(self) -> None:
+        """
+        Plans all agents from their current positions, keeping their
+        committed steps. Without a solution within the budget, the least
+        conflicting plan is committed up to its first conflict, and without
+        a conflict-free first step the agents without committed steps wait.
+        """
+        self.num_replans += 1
+        if not self.goals:
+            return
+        goals = dict(self.goals)
+        environment = self.create_environment(goals)
+        self.unreachable = {
+            agent for agent, distances in environment.distance_maps.items()
+            if distances[environment.cell_index(
+                environment.agent_dict[agent]['start'].position)] ==
+            UNREACHABLE}
+        if self.unreachable:
+            committed_paths = self.committed_paths()
+            # Two agents can't share a goal, so an agent waits at the
+            # nearest cell that is no other agent's goal
+            taken = {goal for agent, goal in goals.items()
+                     if agent not in self.unreachable}
+            for agent in sorted(self.unreachable, key=str):
+                goals[agent] = self.waiting_position(
+                    environment, committed_paths[agent][-1], taken)
+                taken.add(goals[agent])
+            environment = self.create_environment(goals)
+
+        initial_constraints = {}
+        warm_start = {}
+        for agent, path in self.paths.items():
+            committed = path[1:1 + self.num_committed[agent]]
+            if committed:
+                constraints = Constraints()
+                for t, position in enumerate(committed, 1):
+                    constraints.positive_vertex_constraints.add(
+                        VertexConstraint(t, Position(*position)))
+                initial_constraints[agent] = constraints
+            else:
+                warm_start[agent] = [State(t, Position(*position))
+                                     for t, position in enumerate(path)]
+
+        if self.suboptimality is None:
+            cbs = CBS(environment, time_limit=self.time_limit,
+                      node_limit=self.node_limit, conflict_window=self.window)
+            plan = cbs.search(initial_constraints, warm_start)
+        else:
+            cbs = ECBS(environment, self.suboptimality,
+                       node_limit=self.node_limit, time_limit=self.time_limit,
+                       conflict_window=self.window)
+            plan = cbs.search(initial_constraints, warm_start)
+        self.result = cbs.result
+        commit = self.commit
+        if not plan:
+            node = cbs.best_node
+            if node is None:
+                self.wait()
+                return
+            plan = cbs.generate_plan(node.solution)
+            # The steps before the first conflict are safe, all of them if
+            # the budget ran out before a conflict-free node was expanded
+            conflict = node.conflict
+            if conflict is not None:
+                commit = min(commit, conflict.time
+                             if conflict.conflict_type == Conflict.EDGE
+                             else conflict.time - 1)
+            if commit < 1:
+                self.wait()
+                return
+
+        for agent, path in plan.items():
+            self.paths[agent] = [position for _, position in path]
+            self.num_committed[agent] = max(commit, self.num_committed[agent])
+
+    def wait(self) -> None:
+        """
+        Keeps the committed steps and makes the agents without any wait one
+        step where they are, to replan at the next step. Waiting is safe
+        when no agent has committed steps, the usual case as a replanning
+        commits the same steps for all agents, and for a new agent, which is
+        added off the committed steps of the others, see add_agent.
+        """
+        for agent, path in self.paths.items():
+            if not self.num_committed[agent]:
+                self.paths[agent] = [path[0], path[0]]
+                self.num_committed[agent] = 1
+
+    def waiting_position(
+            self,
+            environment: Environment,
+            position: tuple,
+            taken: set) -> tuple:
+        """
+        :param environment: An Environment of the map
+        :param position: Where the agent is after its committed steps
+        :param taken: Positions that are other agents' goals
+        :returns: The position closest to position, by breadth-first search,
+                    that is not taken, position itself if all the reachable
+                    ones are
+        """
+        start = environment.cell_index(Position(*position))
+        visited = {start}
+        queue = deque([start])
+        while queue:
+            cell = queue.popleft()
+            cell_position = environment.cell_positions[cell]
+            if (cell_position.x, cell_position.y) not in taken:
+                return cell_position.x, cell_position.y
+            for next_cell, _ in environment.neighbor_table[cell]:
+                if next_cell not in visited:
+                    visited.add(next_cell)
+                    queue.append(next_cell)
+        return position
+
+    def create_environment(
+            self,
+            goals: dict) -> Environment:
+        """
+        :param goals: The goal of every agent, keyed by agent name
+        :returns: An Environment with the agents at their current positions
+        """
+        return Environment({
+            'dimensions': self.dimensions,
+            'obstacles': self.obstacles,
+            'agents': [{'name': agent, 'start': path[0],
+                        'goal': goals[agent]}
+                       for agent, path in self.paths.items()]})
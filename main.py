@@ -31,57 +31,19 @@
 # Author - Arsalan Akhter
 
 
-from itertools import zip_longest
-from pogema import pogema_v0, GridConfig
-from pogema.animation import AnimationMonitor
+import argparse
+import json
+import sys
+
+import numpy as np
 
 from environment import Environment
 from cbs import CBS
+from vectorized_plans import plan_to_actions, validate_plan
 
-
-def extract_moves_from_solution(solution):
-    # Actions
-    WAIT = 0
-    LEFT = 1
-    RIGHT = 2
-    DOWN = 3
-    UP = 4
-
-    moves = []
-    single_move = []
-    for r_ID, sol in solution.items():
-        for s1, s2 in zip(sol[:-1], sol[1:]):
-            _, q1 = s1
-            x1, y1 = q1
-            _, q2 = s2
-            x2, y2 = q2
-
-            if x2 == x1 and y2 == y1:
-                single_move.append(WAIT)
-            elif x2 == x1 - 1 and y2 == y1:
-                single_move.append(LEFT)
-            elif x2 == x1 + 1 and y2 == y1:
-                single_move.append(RIGHT)
-            elif x2 == x1 and y2 == y1 - 1:
-                single_move.append(DOWN)
-            elif x2 == x1 and y2 == y1 + 1:
-                single_move.append(UP)
-            else:
-                raise ValueError("Wrong Move detected!")
-        moves.append(single_move)
-        single_move = []
-    # Make them step moves for all agents at one step
-    moves2 = [list(i) for i in zip_longest(*moves, fillvalue=0)]
-    return moves2
-
-def main():
-    # grid = """
-    # B##A
-    # ....
-    # a##b
-    # """
-
-    grid = """
+# Solved when no grid file is given. As in pogema, "#" is an obstacle, a
+# lowercase letter an agent's start and the same uppercase letter its goal.
+DEFAULT_GRID = """
     ........
     B######A
     .######.
@@ -93,47 +55,152 @@ def main():
     ........
     """
 
-    # Define new configuration
-    grid_config = GridConfig(map=grid)
+
+def extract_moves_from_solution(solution):
+    """
+    :param solution: The plan, see CBS.generate_plan
+    :returns: The actions of all agents at each step, a list of lists, see
+                vectorized_plans.plan_to_actions
+    """
+    return plan_to_actions(solution).tolist()
+
+
+def grid_to_env_dict(grid: str) -> dict:
+    """
+    Parses a grid the way pogema's GridConfig does, without importing
+    pogema. Agents are named R_0, R_1, ... in the order of their letters,
+    which is also pogema's order of agents.
+
+    :param grid: Rows of ".", "#" and letters, separated by whitespace
+    :returns: An env_dict, as consumed by the Environment class
+    """
+    rows = grid.split()
+    obstacles = []
+    starts = {}
+    goals = {}
+    for x, row in enumerate(rows):
+        if len(row) != len(rows[0]):
+            raise ValueError("Row {} of the grid has a different "
+                             "length".format(x))
+        for y, char in enumerate(row):
+            if char == '#':
+                obstacles.append((x, y))
+            elif 'a' <= char <= 'z':
+                starts[char] = (x, y)
+            elif 'A' <= char <= 'Z':
+                goals[char.lower()] = (x, y)
+            elif char != '.':
+                raise ValueError("Unsupported symbol {!r} in row {}".format(
+                    char, x))
+    if starts.keys() != goals.keys():
+        raise ValueError("Every agent needs both a start and a goal")
+    return {'dimensions': (len(rows), len(rows[0])),
+            'obstacles': obstacles,
+            'agents': [{'name': 'R_' + str(i),
+                        'start': starts[letter],
+                        'goal': goals[letter]}
+                       for i, letter in enumerate(sorted(starts))]
+            }
+
+
+def write_plan_jsonl(
+        plan: dict,
+        moves: np.ndarray,
+        file) -> None:
+    """
+    Writes one JSON line per agent holding its path, as in
+    CBS.generate_plan, and its actions
+
+    :param plan: The plan, see CBS.generate_plan
+    :param moves: Its actions, see vectorized_plans.plan_to_actions
+    :param file: A text file to write to
+    """
+    for column, (agent, path) in enumerate(plan.items()):
+        file.write(json.dumps({'agent': agent, 'path': path,
+                               'actions': moves[:, column].tolist()}))
+        file.write('\n')
+
+
+def write_actions_npy(
+        moves: np.ndarray,
+        path: str) -> None:
+    """
+    Saves the actions, a (time steps x agents) int8 array with the agents in
+    the order of the plan, in the .npy format
+
+    :param moves: The actions, see vectorized_plans.plan_to_actions
+    :param path: The file to write
+    """
+    np.save(path, moves)
+
+
+def render(
+        grid: str,
+        moves: np.ndarray,
+        path: str = "render.svg") -> None:
+    """
+    Replays the actions in a pogema arena and saves the animation
+    """
+    # Imported here, so that solving and exporting work without pogema
+    from pogema import pogema_v0, GridConfig
+    from pogema.animation import AnimationMonitor
 
     # Create custom Pogema-based arena
-    arena = pogema_v0(grid_config=grid_config)
-
-    # Render the arena
-    # arena.reset()
-    # arena.render()
-    # Extract the relevant parameters from grid_config
-    arena_map = grid_config.map
-
-    # Create an environment dict for input to the environment class
-    # Assuming a 2-dimensional grid
-    env_dict = {'dimensions': (len(arena_map), len(arena_map[0])),
-                'arena_map': arena_map,
-                'obstacles': [(idx, idx2) for idx, i in enumerate(arena_map)
-                              for idx2, j in enumerate(i) if j == 1],
-                'agents': [{'name': 'R_' + str(i),
-                            'start': tuple(grid_config.agents_xy[i]),
-                            'goal': tuple(grid_config.targets_xy[i])}
-                           for i in range(grid_config.num_agents)]
-                }
+    arena = AnimationMonitor(pogema_v0(grid_config=GridConfig(map=grid)))
+    arena.reset()
+    # Convert the agent results back to steps for pogema to render
+    for step in moves.tolist():
+        obs, reward, done, info = arena.step(step)
+
+    arena.save_animation(path)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--grid', default=None,
+                        help='file holding the grid, by default DEFAULT_GRID')
+    parser.add_argument('--format', choices=['jsonl', 'npy'], default='jsonl',
+                        help='jsonl writes the paths and actions of the '
+                             'agents, npy the action array alone')
+    parser.add_argument('--output', default='-',
+                        help='file to write, - for stdout (jsonl only)')
+    parser.add_argument('--render', nargs='?', const='render.svg',
+                        default=None, metavar='SVG',
+                        help='also render the plan with pogema')
+    args = parser.parse_args()
+
+    grid = DEFAULT_GRID
+    if args.grid is not None:
+        with open(args.grid) as file:
+            grid = file.read()
+
+    env_dict = grid_to_env_dict(grid)
     cbs_env = Environment(env_dict)
     # Searching
     cbs = CBS(cbs_env)
     solution = cbs.search()
     if not solution:
-        print(" Solution not found")
+        print(" Solution not found", file=sys.stderr)
+        sys.exit(1)
     # print('Solution Template: (time-step, (x, y))')
-    # print(solution)
-
-    # For Animation
-    arena = AnimationMonitor(arena)
-    arena.reset()
-    steps = extract_moves_from_solution(solution)
-    # Convert the agent results back to steps for pogema to render
-    for step in steps:
-        obs, reward, done, info = arena.step(step)
-
-    arena.save_animation("render.svg")
+    violations = validate_plan(solution, env_dict)
+    if violations:
+        print(" Invalid plan: " + str(violations[:10]), file=sys.stderr)
+        sys.exit(1)
+    moves = plan_to_actions(solution)
+
+    if args.format == 'npy':
+        if args.output == '-':
+            parser.error('--format npy needs an --output file')
+        write_actions_npy(moves, args.output)
+    elif args.output == '-':
+        write_plan_jsonl(solution, moves, sys.stdout)
+    else:
+        with open(args.output, 'w') as file:
+            write_plan_jsonl(solution, moves, file)
+
+    if args.render is not None:
+        render(grid, moves, args.render)
 
 
 if __name__ == "__main__":
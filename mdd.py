@@ -0,0 +1,100 @@
+from __future__ import annotations
+from reservation_table import ReservationTable
+
+
+class MDD:
+    """
+    Multi-valued Decision Diagram of an agent: the (time, cell) pairs lying
+    on at least one shortest path that respects the agent's constraints.
+    Level t holds the cells the agent may occupy at time t. After its last
+    level the agent waits at its goal, so every later level is the goal
+    alone.
+
+    A level holding a single cell means every shortest path goes through that
+    cell at that time: constraining it forces the agent's cost up.
+    """
+    def __init__(
+            self,
+            environment,
+            agent_name,
+            reservation_table: ReservationTable,
+            path_length: int) -> None:
+        """
+        :param environment: The Environment the agent lives in
+        :param agent_name: The agent
+        :param reservation_table: The agent's compiled constraints
+        :param path_length: Length of the agent's shortest paths, in states
+        """
+        self.levels = []
+        self.neighbor_table = environment.neighbor_table
+        self.reservation_table = reservation_table
+        self.build(environment, agent_name, reservation_table, path_length)
+
+    def build(
+            self,
+            environment,
+            agent_name,
+            reservation_table: ReservationTable,
+            path_length: int) -> None:
+        start = environment.cell_index(
+            environment.agent_dict[agent_name]['start'].position)
+        goal = environment.cell_index(
+            environment.agent_dict[agent_name]['goal'].position)
+        distances = environment.distance_maps[agent_name]
+        neighbor_table = environment.neighbor_table
+        arrival = path_length - 1
+
+        # Forward: cells reachable at time t from which the goal is still
+        # reachable by the arrival time
+        forward = [{start}]
+        for t in range(1, arrival + 1):
+            level = set()
+            for cell in forward[-1]:
+                for next_cell, _ in neighbor_table[cell]:
+                    if t + distances[next_cell] <= arrival and \
+                            not reservation_table.is_cell_blocked(
+                                t, next_cell) and \
+                            not reservation_table.is_move_blocked(
+                                t - 1, cell, next_cell):
+                        level.add(next_cell)
+            forward.append(level)
+
+        # Backward: keep the cells that lead to the goal at the arrival time
+        self.levels = [set() for _ in range(arrival + 1)]
+        self.levels[arrival] = forward[arrival] & {goal}
+        for t in range(arrival - 1, -1, -1):
+            following = self.levels[t + 1]
+            for cell in forward[t]:
+                for next_cell, _ in neighbor_table[cell]:
+                    if next_cell in following and \
+                            not reservation_table.is_move_blocked(
+                                t, cell, next_cell):
+                        self.levels[t].add(cell)
+                        break
+
+    def successors(
+            self,
+            t: int,
+            cell: int) -> list:
+        """
+        Cells following cell at time t + 1 on some shortest path. Any valid
+        move between consecutive levels is one, since both of its ends lie on
+        shortest paths.
+        """
+        if t + 1 >= len(self.levels):
+            return [cell]
+        following = self.levels[t + 1]
+        return [next_cell for next_cell, _ in self.neighbor_table[cell]
+                if next_cell in following and
+                not self.reservation_table.is_move_blocked(t, cell, next_cell)]
+
+    def is_singleton(
+            self,
+            t: int,
+            cell: int) -> bool:
+        """
+        Checks if every shortest path is at cell at time t
+        """
+        if t >= len(self.levels):
+            return self.levels[-1] == {cell}
+        return self.levels[t] == {cell}
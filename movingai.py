@@ -0,0 +1,99 @@
+from __future__ import annotations
+import os
+
+# Terrain of the MovingAI .map format that agents may enter: ground ("." and
+# "G") and swamp. Out of bounds ("@" and "O"), trees and water are obstacles.
+FREE_TERRAIN = '.GS'
+
+
+def read_map(
+        path: str) -> tuple:
+    """
+    Reads a map in the MovingAI .map format:
+
+        type octile
+        height <rows>
+        width <columns>
+        map
+        <rows lines of columns characters>
+
+    :param path: Path of the .map file
+    :returns: (dimensions, obstacles) in the format of an env_dict, with a
+                position's x being its row and y its column
+    """
+    with open(path) as file:
+        lines = file.read().splitlines()
+    header = {}
+    line_number = 0
+    while lines[line_number].strip() != 'map':
+        key, _, value = lines[line_number].strip().partition(' ')
+        header[key] = value
+        line_number += 1
+    rows, columns = int(header['height']), int(header['width'])
+    grid = lines[line_number + 1:line_number + 1 + rows]
+    if len(grid) != rows or any(len(line) < columns for line in grid):
+        raise ValueError("Map {} is smaller than its header states".format(
+            path))
+    obstacles = [(x, y) for x in range(rows) for y in range(columns)
+                 if grid[x][y] not in FREE_TERRAIN]
+    return (rows, columns), obstacles
+
+
+def read_scenario(
+        path: str) -> list:
+    """
+    Reads a scenario in the MovingAI .scen format, a "version 1" line
+    followed by one tab-separated line per agent:
+
+        bucket map width height start_x start_y goal_x goal_y optimal_length
+
+    The x coordinates of the format are columns and the y coordinates rows.
+
+    :param path: Path of the .scen file
+    :returns: A list of dicts with the map file name, the start and goal as
+                (row, column) and the optimal length of the agent alone
+    """
+    agents = []
+    with open(path) as file:
+        for line in file:
+            fields = line.split('\t')
+            if len(fields) < 9:
+                # The version line or a blank line
+                continue
+            start_x, start_y, goal_x, goal_y = map(int, fields[4:8])
+            agents.append({'map': fields[1],
+                           'start': (start_y, start_x),
+                           'goal': (goal_y, goal_x),
+                           'optimal_length': float(fields[8])})
+    return agents
+
+
+def load_instance(
+        scenario_path: str,
+        num_agents: int,
+        map_path: str = None) -> dict:
+    """
+    Creates an instance from the first num_agents agents of a scenario, as
+    the MAPF benchmarks do when sweeping the number of agents
+
+    :param scenario_path: Path of the .scen file
+    :param num_agents: Number of agents to take from the scenario
+    :param map_path: Path of the .map file, by default the map named in the
+                        scenario, looked up next to the scenario file
+    :returns: An env_dict, as consumed by the Environment class
+    """
+    agents = read_scenario(scenario_path)
+    if num_agents > len(agents):
+        raise ValueError("Scenario {} has {} agents, {} requested".format(
+            scenario_path, len(agents), num_agents))
+    if map_path is None:
+        map_path = os.path.join(os.path.dirname(scenario_path),
+                                agents[0]['map'])
+    dimensions, obstacles = read_map(map_path)
+    return {'dimensions': dimensions,
+            'obstacles': obstacles,
+            'agents': [{'name': 'R_' + str(i),
+                        'start': agent['start'],
+                        'goal': agent['goal']}
+                       for i, agent in enumerate(agents[:num_agents])]
+            }
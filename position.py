@@ -1,10 +1,18 @@
 from __future__ import annotations
 
+# Number of bits reserved for each coordinate when packing positions, states
+# and constraints into integer hashes. Hashes are collision-free as long as
+# 0 <= x, y < 2 ** COORDINATE_BITS and the time stays below 2 ** 25, which
+# keeps every packed value within the 61 bits Python hashes ints to.
+COORDINATE_BITS = 16
+
 
 class Position:
     """
     The Position class defines a specific position (x,y) in the environment.
     """
+    __slots__ = ('x', 'y')
+
     def __init__(
             self,
             x: int = -1,
@@ -17,6 +25,11 @@ class Position:
             other: Position) -> bool:
         return self.x == other.x and self.y == other.y
 
+    def __hash__(
+            self) -> hash:
+        """Packs (x, y) into a single integer"""
+        return (self.x << COORDINATE_BITS) | self.y
+
     def __str__(
             self) -> str:
         return str((self.x, self.y))
@@ -0,0 +1,144 @@
+from __future__ import annotations
+import random
+from time import perf_counter
+from cbs import CBS
+from reservation_table import ReservationTable
+from search_result import SearchResult
+
+
+class PrioritizedPlanning:
+    """
+    Prioritized planning: the agents are planned one after the other, in
+    priority order, each one with the low-level search of the Environment
+    against a reservation table shared by all agents. Once an agent is
+    planned its path is reserved, so every later agent avoids it, and its
+    goal is blocked for good from the time the agent stays there.
+
+    Planning is fast, each agent is searched for once, but neither optimal
+    nor complete: an agent may find its way blocked by the agents planned
+    before it. The search then restarts with a random priority order.
+    """
+    def __init__(
+            self,
+            environment,
+            max_restarts: int = 10,
+            time_limit: float = None,
+            seed: int = 0) -> None:
+        """
+        :param environment: The Environment to plan in
+        :param max_restarts: Number of random priority orders tried after
+                                the first one fails
+        :param time_limit: Seconds after which no new priority order is
+                            tried, None for no limit
+        :param seed: Seed of the random priority orders
+        """
+        self.env = environment
+        self.max_restarts = max_restarts
+        self.time_limit = time_limit
+        self.seed = seed
+        # Priority order of the last plan attempt, highest priority first
+        self.order = []
+        self.num_restarts = 0
+        # Outcome of the last search, a SearchResult. Its node counts hold
+        # the number of priority orders tried.
+        self.result = None
+
+    def search(self) -> dict:
+        """
+        :returns: The plan, in the format of CBS.generate_plan, {} if no
+                    priority order tried led to one
+        """
+        start_time = perf_counter()
+        generator = random.Random(self.seed)
+        self.order = self.initial_order()
+        self.num_restarts = 0
+        while True:
+            solution = self.plan_in_order(self.order)
+            if len(solution) == len(self.order):
+                return self.finish(SearchResult.SOLVED, solution, start_time)
+            if self.num_restarts == self.max_restarts:
+                return self.finish(SearchResult.NO_SOLUTION, solution,
+                                   start_time)
+            if self.time_limit is not None and \
+                    perf_counter() - start_time >= self.time_limit:
+                return self.finish(SearchResult.TIMEOUT, solution,
+                                   start_time)
+            self.num_restarts += 1
+            self.order = list(self.order)
+            generator.shuffle(self.order)
+
+    def initial_order(self) -> list:
+        """
+        Agents with the shortest distance to their goal first: they settle
+        at their goals early, which the later agents then plan around,
+        instead of being kept waiting for the longer paths to pass
+        """
+        def distance(agent):
+            start = self.env.agent_dict[agent]['start']
+            return self.env.distance_maps[agent][
+                self.env.cell_index(start.position)]
+        return sorted(self.env.agent_dict.keys(), key=distance)
+
+    def plan_in_order(
+            self,
+            order: list) -> dict:
+        """
+        Plans the agents in priority order until one of them has no path
+
+        :param order: The agents, highest priority first
+        :returns: The paths of the agents planned, keyed by agent name
+        """
+        table = ReservationTable(self.env.num_cells)
+        solution = {}
+        for agent in order:
+            # The low-level search reads the environment's reservation table
+            self.env.reservation_table = table
+            path = self.env.a_star.search(agent)
+            if not path:
+                break
+            solution[agent] = path
+            self.reserve_path(table, path)
+        return solution
+
+    def reserve_path(
+            self,
+            table: ReservationTable,
+            path: list) -> None:
+        """
+        Keeps the later agents off a path: off its cells at their times, from
+        swapping with its moves and off its last cell once it is reached
+        """
+        cells = [self.env.cell_index(state.position) for state in path]
+        for t, cell in enumerate(cells):
+            table.block_cell(t, cell)
+        for t in range(len(cells) - 1):
+            if cells[t] != cells[t + 1]:
+                table.block_move(t, cells[t + 1], cells[t])
+        table.park(len(cells), cells[-1])
+
+    def finish(
+            self,
+            status: str,
+            solution: dict,
+            start_time: float) -> dict:
+        """
+        Records the outcome of the search in result
+
+        :param status: See SearchResult
+        :param solution: The paths planned by the last priority order tried
+        :param start_time: perf_counter() at the start of the search
+        :returns: The plan if solved, else {}
+        """
+        # Agents in the order of the environment, as CBS returns them
+        solution = {agent: solution[agent] for agent in self.env.agent_dict
+                    if agent in solution}
+        lower_bound = sum(self.env.distance_maps[agent][self.env.cell_index(
+            attributes['start'].position)] + 1
+            for agent, attributes in self.env.agent_dict.items())
+        plan = CBS.generate_plan(solution)
+        self.result = SearchResult(
+            status, plan, self.env.compute_solution_cost(solution),
+            lower_bound, 0 if status == SearchResult.SOLVED else None,
+            self.num_restarts + 1, self.num_restarts + 1,
+            perf_counter() - start_time)
+        return plan if status == SearchResult.SOLVED else {}
@@ -0,0 +1,137 @@
+from __future__ import annotations
+from constraints import Constraints
+
+
+class ReservationTable:
+    """
+    The constraints of one agent compiled into time-indexed lookup tables
+    over the flat cell indices of an Environment, so that the low-level
+    search checks a move with a dictionary and a set lookup instead of
+    building constraint objects.
+
+    vertices maps a time step to the set of cells the agent may not occupy
+    at that time. edges maps a time step t to the set of moves the agent may
+    not start at t, each move packed as from_cell * num_cells + to_cell.
+    required maps a time step to the only cell the agent may occupy at that
+    time, from positive constraints; a positive constraint on a move
+    requires both of its ends. parked maps a cell to the time step from
+    which it is blocked for good, as when another agent stays at its goal
+    there.
+    """
+    # Required cell of a time step at which no cell can be occupied
+    IMPOSSIBLE = -1
+
+    def __init__(
+            self,
+            num_cells: int = 0) -> None:
+        self.num_cells = num_cells
+        self.vertices = {}
+        self.edges = {}
+        # Latest time step at which any constraint applies, -1 if none does
+        self.latest_time = -1
+        # Latest time step at which each constrained cell is blocked
+        self.latest_vertex_time = {}
+        self.required = {}
+        self.parked = {}
+        # Latest time step with a required cell, -1 if there is none
+        self.latest_required_time = -1
+
+    @classmethod
+    def from_constraints(
+            cls,
+            constraints: Constraints,
+            environment) -> ReservationTable:
+        """
+        Compiles the constraints of an agent
+
+        :param constraints: The constraints of the agent
+        :param environment: The Environment the cell indices refer to
+        :returns: A new ReservationTable
+        """
+        table = cls(environment.num_cells)
+        for vertex_constraint in constraints.vertex_constraints:
+            table.block_cell(vertex_constraint.time,
+                             environment.cell_index(vertex_constraint.position))
+        for edge_constraint in constraints.edge_constraints:
+            table.block_move(edge_constraint.time,
+                             environment.cell_index(edge_constraint.position_1),
+                             environment.cell_index(edge_constraint.position_2))
+        for vertex_constraint in constraints.positive_vertex_constraints:
+            table.require_cell(vertex_constraint.time,
+                               environment.cell_index(
+                                   vertex_constraint.position))
+        for edge_constraint in constraints.positive_edge_constraints:
+            table.require_cell(edge_constraint.time, environment.cell_index(
+                edge_constraint.position_1))
+            table.require_cell(edge_constraint.time + 1,
+                               environment.cell_index(
+                                   edge_constraint.position_2))
+        return table
+
+    def block_cell(
+            self,
+            time: int,
+            cell: int) -> None:
+        self.vertices.setdefault(time, set()).add(cell)
+        self.latest_time = max(self.latest_time, time)
+        self.latest_vertex_time[cell] = max(
+            self.latest_vertex_time.get(cell, -1), time)
+
+    def block_move(
+            self,
+            time: int,
+            from_cell: int,
+            to_cell: int) -> None:
+        self.edges.setdefault(time, set()).add(
+            from_cell * self.num_cells + to_cell)
+        # The move ends at time + 1
+        self.latest_time = max(self.latest_time, time + 1)
+
+    def park(
+            self,
+            time: int,
+            cell: int) -> None:
+        """
+        Blocks a cell at every time step from time on
+        """
+        self.parked[cell] = min(time, self.parked.get(cell, time))
+        self.latest_time = max(self.latest_time, time)
+
+    def require_cell(
+            self,
+            time: int,
+            cell: int) -> None:
+        if self.required.get(time, cell) != cell:
+            # Two different cells required at once, none can be occupied
+            cell = self.IMPOSSIBLE
+        self.required[time] = cell
+        self.latest_time = max(self.latest_time, time)
+        self.latest_required_time = max(self.latest_required_time, time)
+
+    def requires_other_cell_after(
+            self,
+            time: int,
+            cell: int) -> bool:
+        """
+        Checks if a cell other than cell is required after time, i.e. if an
+        agent staying at cell from time on breaks a positive constraint
+        """
+        if time >= self.latest_required_time:
+            return False
+        return any(required_time > time and required_cell != cell
+                   for required_time, required_cell in self.required.items())
+
+    def is_cell_blocked(
+            self,
+            time: int,
+            cell: int) -> bool:
+        return cell in self.vertices.get(time, ()) or \
+            self.required.get(time, cell) != cell or \
+            time >= self.parked.get(cell, time + 1)
+
+    def is_move_blocked(
+            self,
+            time: int,
+            from_cell: int,
+            to_cell: int) -> bool:
+        return from_cell * self.num_cells + to_cell in self.edges.get(time, ())
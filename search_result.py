@@ -0,0 +1,79 @@
+from __future__ import annotations
+
+
+class SearchProgress:
+    """
+    Snapshot of a running CBS search, passed to its progress callback.
+    lower_bound is the best lower bound on the cost of a solution proven so
+    far, and num_conflicts the number of conflicts of the least conflicting
+    node generated so far.
+    """
+    __slots__ = ('num_expanded', 'num_generated', 'open_size', 'lower_bound',
+                 'num_conflicts', 'elapsed')
+
+    def __init__(
+            self,
+            num_expanded: int,
+            num_generated: int,
+            open_size: int,
+            lower_bound: int,
+            num_conflicts: int,
+            elapsed: float) -> None:
+        self.num_expanded = num_expanded
+        self.num_generated = num_generated
+        self.open_size = open_size
+        self.lower_bound = lower_bound
+        self.num_conflicts = num_conflicts
+        # Seconds since the search started
+        self.elapsed = elapsed
+
+
+class SearchResult:
+    """
+    Outcome of a CBS search. When no solution was found within the budget,
+    plan holds the least conflicting plan generated instead, its conflicts
+    counted by num_conflicts, and lower_bound the best lower bound on the
+    cost of a solution.
+    """
+    SOLVED = 'solved'
+    TIMEOUT = 'timeout'
+    NODE_LIMIT = 'node_limit'
+    NO_SOLUTION = 'no_solution'
+
+    __slots__ = ('status', 'plan', 'cost', 'lower_bound', 'num_conflicts',
+                 'num_expanded', 'num_generated', 'elapsed', 'stats')
+
+    def __init__(
+            self,
+            status: str,
+            plan: dict,
+            cost: int,
+            lower_bound: int,
+            num_conflicts: int,
+            num_expanded: int,
+            num_generated: int,
+            elapsed: float,
+            stats=None) -> None:
+        """
+        :param status: SOLVED, TIMEOUT, NODE_LIMIT or NO_SOLUTION
+        :param plan: The plan, see CBS.generate_plan, {} if no node was
+                        generated
+        :param cost: Cost of the plan, None without a plan
+        :param lower_bound: Lower bound on the cost of a solution
+        :param num_conflicts: Conflicts left in the plan, 0 once solved
+        :param stats: The SearchStats of the search, None if not collected
+        """
+        self.status = status
+        self.plan = plan
+        self.cost = cost
+        self.lower_bound = lower_bound
+        self.num_conflicts = num_conflicts
+        self.num_expanded = num_expanded
+        self.num_generated = num_generated
+        # Seconds the search took
+        self.elapsed = elapsed
+        self.stats = stats
+
+    @property
+    def solved(self) -> bool:
+        return self.status == SearchResult.SOLVED
@@ -0,0 +1,104 @@
+from __future__ import annotations
+import json
+
+
+class SearchStats:
+    """
+    Counters and timers of a CBS search. A SearchStats passed to CBS is
+    filled in by the search and returned in its SearchResult. Without one,
+    CBS only checks for its absence, so nothing is counted or timed.
+
+    The phases timed, in seconds summed over the search:
+    - LOW_LEVEL: the low-level searches, in this process or in a worker pool
+    - CONFLICT_DETECTION: finding the conflicts of new paths, including
+      updating the occupancy map
+    - NODE_CREATION: creating the children of expanded nodes with their
+      constraints
+    - CONFLICT_SELECTION: choosing the conflict to split on, including
+      building MDDs
+    - HEURISTIC: computing the high-level heuristic
+    """
+    LOW_LEVEL = 'low_level'
+    CONFLICT_DETECTION = 'conflict_detection'
+    NODE_CREATION = 'node_creation'
+    CONFLICT_SELECTION = 'conflict_selection'
+    HEURISTIC = 'heuristic'
+
+    def __init__(
+            self,
+            timers: bool = True,
+            profiler=None) -> None:
+        """
+        :param timers: Time the phases of the search, else only count
+        :param profiler: Enabled for the duration of each search, e.g. a
+                            cProfile.Profile. Any object with enable() and
+                            disable() methods will do, so a sampling profiler
+                            is attached through a small adapter.
+        """
+        self.timers = timers
+        self.profiler = profiler
+        self.reset()
+
+    def reset(self) -> None:
+        self.num_expanded = 0
+        self.num_generated = 0
+        self.peak_open_size = 0
+        # Low-level searches and states expanded by them, keyed by agent.
+        # The expansions of searches run in a worker pool are not counted.
+        self.low_level_searches = {}
+        self.low_level_expansions = {}
+        self.phase_times = {}
+        # Seconds the search took
+        self.elapsed = 0.0
+
+    def record_low_level(
+            self,
+            agent,
+            expansions: int) -> None:
+        """
+        :param agent: The agent planned
+        :param expansions: States expanded by the search, None if unknown
+        """
+        self.low_level_searches[agent] = \
+            self.low_level_searches.get(agent, 0) + 1
+        if expansions is not None:
+            self.low_level_expansions[agent] = \
+                self.low_level_expansions.get(agent, 0) + expansions
+
+    def add_time(
+            self,
+            phase: str,
+            seconds: float) -> None:
+        self.phase_times[phase] = self.phase_times.get(phase, 0.0) + seconds
+
+    def observe_open_size(
+            self,
+            size: int) -> None:
+        if size > self.peak_open_size:
+            self.peak_open_size = size
+
+    def to_dict(self) -> dict:
+        """
+        :returns: The statistics as a dict of JSON types, agents keyed by
+                    their names as strings
+        """
+        return {'num_expanded': self.num_expanded,
+                'num_generated': self.num_generated,
+                'peak_open_size': self.peak_open_size,
+                'elapsed': self.elapsed,
+                'low_level_searches': sum(self.low_level_searches.values()),
+                'low_level_expansions':
+                    sum(self.low_level_expansions.values()),
+                'agents': {str(agent): {
+                    'searches': searches,
+                    'expansions': self.low_level_expansions.get(agent, 0)}
+                    for agent, searches in self.low_level_searches.items()},
+                'phase_times': dict(self.phase_times)}
+
+    def to_json(
+            self,
+            **kwargs) -> str:
+        """
+        :param kwargs: Passed on to json.dumps, e.g. indent
+        """
+        return json.dumps(self.to_dict(), **kwargs)
@@ -0,0 +1,286 @@
+from __future__ import annotations
+import json
+import sqlite3
+from collections import OrderedDict
+from hashlib import blake2b
+
+from cbs import CBS
+from position import Position
+from state import State
+from vectorized_plans import validate_plan
+
+
+class SolutionCache:
+    """
+    Cache of solved instances in two tiers: a least-recently-used dict in
+    memory and, optionally, a sqlite database on disk that outlives the
+    process and is shared by the processes using the same file.
+
+    A plan is keyed by the fingerprint of its map, of its set of (start,
+    goal) pairs, so agent names and order don't matter, and of the solver
+    that found it, see solver_key, so a bounded-suboptimal plan never stands
+    in for an optimal one. A cached plan is validated before it is returned.
+    Besides whole plans, the cache keeps every agent path of a stored plan
+    that is a shortest path, keyed by the map, start and goal. They warm
+    start CBS on instances where only some agents changed.
+    """
+    # Key of the plans of CBS, which are optimal
+    OPTIMAL = 'CBS'
+
+    def __init__(
+            self,
+            max_entries: int = 256,
+            path: str = None) -> None:
+        """
+        :param max_entries: Number of plans, and separately of agent paths,
+                            kept in memory
+        :param path: File of the sqlite database, None for a memory only
+                        cache
+        """
+        self.max_entries = max_entries
+        self.plans = OrderedDict()
+        self.paths = OrderedDict()
+        self.database = None
+        if path is not None:
+            self.database = sqlite3.connect(path)
+            for table in ('plans', 'paths'):
+                self.database.execute(
+                    'CREATE TABLE IF NOT EXISTS {} '
+                    '(key TEXT PRIMARY KEY, value TEXT)'.format(table))
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        # Agents whose root path came from the cache
+        self.warm_started_agents = 0
+
+    @staticmethod
+    def canonical_agents(
+            environment) -> list:
+        """
+        :returns: The agents ordered by start and goal cell
+        """
+        return sorted(environment.agent_dict.keys(), key=lambda agent: (
+            environment.cell_index(
+                environment.agent_dict[agent]['start'].position),
+            environment.cell_index(
+                environment.agent_dict[agent]['goal'].position)))
+
+    @staticmethod
+    def solver_key(
+            solver) -> str:
+        """
+        :returns: What the plans of a solver are cached under, its class and
+                    suboptimality factor, e.g. "CBS" or "ECBS w=1.5". None
+                    for a solver with a conflict window, whose plans are not
+                    solutions of the whole instance and are not cached.
+        """
+        if getattr(solver, 'conflict_window', None) is not None:
+            return None
+        suboptimality = getattr(solver, 'suboptimality', None)
+        if suboptimality is None:
+            return type(solver).__name__
+        return '{} w={}'.format(type(solver).__name__, suboptimality)
+
+    @staticmethod
+    def instance_key(
+            environment,
+            solver_key: str = OPTIMAL) -> str:
+        endpoints = [(environment.cell_index(agent['start'].position),
+                      environment.cell_index(agent['goal'].position))
+                     for agent in environment.agent_dict.values()]
+        return blake2b(repr((environment.map_fingerprint,
+                             sorted(endpoints), solver_key)).encode(),
+                       digest_size=16).hexdigest()
+
+    @staticmethod
+    def path_key(
+            environment,
+            agent) -> str:
+        return blake2b(repr((
+            environment.map_fingerprint,
+            environment.cell_index(
+                environment.agent_dict[agent]['start'].position),
+            environment.cell_index(
+                environment.agent_dict[agent]['goal'].position))).encode(),
+            digest_size=16).hexdigest()
+
+    def get(
+            self,
+            environment,
+            solver_key: str = OPTIMAL) -> dict:
+        """
+        :param environment: The instance
+        :param solver_key: The solver the plan is requested from, see
+                            solver_key
+        :returns: Its cached plan, see CBS.generate_plan, None on a miss. A
+                    cached plan that is not a valid solution of the instance
+                    is a miss.
+        """
+        key = self.instance_key(environment, solver_key)
+        paths, on_disk = self.lookup(self.plans, 'plans', key)
+        plan = None
+        if paths is not None:
+            plan = {agent: [(t, tuple(position))
+                            for t, position in enumerate(path)]
+                    for agent, path in zip(
+                        self.canonical_agents(environment), paths)}
+            # In the order of the agents, as the solvers return plans
+            plan = {agent: plan[agent] for agent in environment.agent_dict}
+            if validate_plan(plan, environment.to_env_dict()):
+                self.discard(self.plans, 'plans', key)
+                plan = None
+        if plan is None:
+            self.misses += 1
+        elif on_disk:
+            self.disk_hits += 1
+        else:
+            self.hits += 1
+        return plan
+
+    def put(
+            self,
+            environment,
+            plan: dict,
+            solver_key: str = OPTIMAL) -> None:
+        """
+        Stores the solution of an instance, and its shortest agent paths
+
+        :param environment: The instance
+        :param plan: Its solution, see CBS.generate_plan, conflict-free and
+                        found without initial constraints
+        :param solver_key: The solver that found it, see solver_key
+        """
+        paths = [[position for _, position in plan[agent]]
+                 for agent in self.canonical_agents(environment)]
+        self.store(self.plans, 'plans',
+                   self.instance_key(environment, solver_key), paths)
+        for agent, path in plan.items():
+            start = environment.agent_dict[agent]['start'].position
+            if len(path) - 1 == environment.distance_maps[agent][
+                    environment.cell_index(start)]:
+                self.store(self.paths, 'paths',
+                           self.path_key(environment, agent),
+                           [position for _, position in path])
+        if self.database is not None:
+            self.database.commit()
+
+    def warm_start(
+            self,
+            environment) -> dict:
+        """
+        :param environment: The instance
+        :returns: The cached shortest paths of its agents, lists of States
+                    keyed by agent name, see CBS.search
+        """
+        warm_start = {}
+        for agent in environment.agent_dict.keys():
+            path, _ = self.lookup(self.paths, 'paths',
+                                  self.path_key(environment, agent))
+            if path is not None:
+                warm_start[agent] = [State(t, Position(x, y))
+                                     for t, (x, y) in enumerate(path)]
+        return warm_start
+
+    def search(
+            self,
+            solver) -> dict:
+        """
+        Returns the plan the solver found on its instance before. On a miss,
+        runs the solver, warm started from the cached agent paths if it is
+        CBS or ECBS, and caches its solution. On a hit the solver doesn't
+        run, so its result is left unchanged. A solver with a conflict window
+        always runs and its plans are not cached.
+
+        :param solver: A solver on the instance, e.g. CBS
+        :returns: The plan, see CBS.generate_plan, {} if none was found
+        """
+        environment = solver.env
+        solver_key = self.solver_key(solver)
+        if solver_key is None:
+            return solver.search()
+        plan = self.get(environment, solver_key)
+        if plan is not None:
+            return plan
+        if isinstance(solver, CBS):
+            warm_start = self.warm_start(environment)
+            self.warm_started_agents += len(warm_start)
+            plan = solver.search(warm_start=warm_start)
+        else:
+            plan = solver.search()
+        if plan:
+            self.put(environment, plan, solver_key)
+        return plan
+
+    @property
+    def hit_rate(self) -> float:
+        lookups = self.hits + self.disk_hits + self.misses
+        return (self.hits + self.disk_hits) / lookups if lookups else 0.0
+
+    def metrics(self) -> dict:
+        return {'hits': self.hits, 'disk_hits': self.disk_hits,
+                'misses': self.misses, 'hit_rate': self.hit_rate,
+                'warm_started_agents': self.warm_started_agents}
+
+    def lookup(
+            self,
+            memory: OrderedDict,
+            table: str,
+            key: str):
+        """
+        Looks a key up in memory, then on disk, promoting a disk hit to
+        memory
+
+        :returns: (the value, None if missing, whether it was read from disk)
+        """
+        value = memory.get(key)
+        if value is not None:
+            memory.move_to_end(key)
+            return value, False
+        if self.database is None:
+            return None, False
+        row = self.database.execute(
+            'SELECT value FROM {} WHERE key = ?'.format(table),
+            (key,)).fetchone()
+        if row is None:
+            return None, False
+        value = json.loads(row[0])
+        self.remember(memory, key, value)
+        return value, True
+
+    def store(
+            self,
+            memory: OrderedDict,
+            table: str,
+            key: str,
+            value: list) -> None:
+        self.remember(memory, key, value)
+        if self.database is not None:
+            self.database.execute(
+                'INSERT OR REPLACE INTO {} VALUES (?, ?)'.format(table),
+                (key, json.dumps(value)))
+
+    def discard(
+            self,
+            memory: OrderedDict,
+            table: str,
+            key: str) -> None:
+        memory.pop(key, None)
+        if self.database is not None:
+            self.database.execute(
+                'DELETE FROM {} WHERE key = ?'.format(table), (key,))
+            self.database.commit()
+
+    def remember(
+            self,
+            memory: OrderedDict,
+            key: str,
+            value: list) -> None:
+        memory[key] = value
+        memory.move_to_end(key)
+        while len(memory) > self.max_entries:
+            memory.popitem(last=False)
+
+    def close(self) -> None:
+        if self.database is not None:
+            self.database.close()
+            self.database = None
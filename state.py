@@ -1,5 +1,5 @@
 from __future__ import annotations
-from position import Position
+from position import Position, COORDINATE_BITS
 
 
 class State:
@@ -7,6 +7,7 @@ class State:
     The State class defines the state of an agent at a specific time. This
     includes both the position and time for that agent
     """
+    __slots__ = ('position', 'time')
 
     def __init__(
             self,
@@ -27,8 +28,9 @@ class State:
 
     def __hash__(
             self) -> hash:
-        """Added to make the State class hashable"""
-        return hash(str(self.time)+str(self.position.x) + str(self.position.y))
+        """Packs (time, x, y) into a single integer"""
+        return (((self.time << COORDINATE_BITS) | self.position.x)
+                << COORDINATE_BITS) | self.position.y
 
     def __str__(
             self) -> str:
@@ -0,0 +1,31 @@
+from lifelong_planner import LifelongPlanner
+
+
+def test_out_of_budget_replannings_wait_without_collisions():
+    # Two rows of agents crossing a corridor, with too small a budget to
+    # resolve their conflicts
+    planner = LifelongPlanner((2, 5), [], window=6, commit=3, node_limit=1)
+    for y in range(3):
+        planner.add_agent('L_{}'.format(y), (0, y), (1, 4 - y))
+        planner.add_agent('R_{}'.format(y), (1, 4 - y), (0, y))
+    positions = {agent: path[0] for agent, path in planner.paths.items()}
+    for _ in range(30):
+        previous, positions = positions, planner.step()
+        assert len(set(positions.values())) == len(positions)
+        for agent, position in positions.items():
+            for other, other_position in positions.items():
+                if agent != other and position != previous[agent]:
+                    assert (position, other_position) != \
+                        (previous[other], previous[agent])
+
+
+def test_unreachable_agent_waits_off_other_goals():
+    # A wall cuts A off from its goal, and A starts at B's goal
+    planner = LifelongPlanner((3, 5), [(0, 3), (1, 3), (2, 3)], window=6,
+                              commit=3)
+    planner.add_agent('A', (1, 1), (1, 4))
+    planner.add_agent('B', (0, 0), (1, 1))
+    for _ in range(6):
+        positions = planner.step()
+    assert planner.unreachable == {'A'}
+    assert positions['B'] == (1, 1)
@@ -0,0 +1,21 @@
+import numpy as np
+
+from cbs import CBS
+from environment import Environment
+from solution_cache import SolutionCache
+from vectorized_plans import plan_to_actions
+
+# Agents listed in another order than their start cells
+ENV_DICT = {'dimensions': (4, 5), 'obstacles': [(1, 1), (2, 3)],
+            'agents': [{'name': 'R_0', 'start': (3, 4), 'goal': (0, 0)},
+                       {'name': 'R_1', 'start': (2, 0), 'goal': (0, 4)},
+                       {'name': 'R_2', 'start': (0, 2), 'goal': (3, 0)}]}
+
+
+def test_hit_and_miss_give_the_same_actions():
+    cache = SolutionCache()
+    miss = cache.search(CBS(Environment(ENV_DICT)))
+    hit = cache.search(CBS(Environment(ENV_DICT)))
+    assert cache.hits == 1
+    assert list(hit) == list(miss) == ['R_0', 'R_1', 'R_2']
+    assert np.array_equal(plan_to_actions(hit), plan_to_actions(miss))
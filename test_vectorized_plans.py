@@ -0,0 +1,33 @@
+from vectorized_plans import MISSING_AGENT, UNKNOWN_AGENT, WRONG_TIME, \
+    validate_plan
+
+ENV_DICT = {'dimensions': (3, 3), 'obstacles': [],
+            'agents': [{'name': 'R_0', 'start': (0, 0), 'goal': (0, 2)},
+                       {'name': 'R_1', 'start': (2, 0), 'goal': (2, 2)}]}
+
+
+def make_plan():
+    return {'R_0': [(0, (0, 0)), (1, (0, 1)), (2, (0, 2))],
+            'R_1': [(0, (2, 0)), (1, (2, 1)), (2, (2, 2))]}
+
+
+def test_valid_plan():
+    assert validate_plan(make_plan(), ENV_DICT) == []
+
+
+def test_missing_agent():
+    plan = make_plan()
+    del plan['R_1']
+    assert validate_plan(plan, ENV_DICT) == [(MISSING_AGENT, 0, 'R_1', None)]
+
+
+def test_unknown_agent():
+    plan = make_plan()
+    plan['R_9'] = [(0, (1, 0))]
+    assert validate_plan(plan, ENV_DICT) == [(UNKNOWN_AGENT, 0, 'R_9', None)]
+
+
+def test_wrong_time_reports_the_offending_step():
+    plan = make_plan()
+    plan['R_0'][2] = (3, (0, 2))
+    assert validate_plan(plan, ENV_DICT) == [(WRONG_TIME, 2, 'R_0', None)]
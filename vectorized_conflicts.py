@@ -0,0 +1,115 @@
+from __future__ import annotations
+import numpy as np
+from conflict import Conflict
+
+
+def build_path_matrix(
+        solution: dict) -> np.ndarray:
+    """
+    Stacks the paths of a solution into an (agents x time x 2) array of
+    (x, y) positions. Paths shorter than the longest one are padded with
+    their last position, as agents stay at their goal.
+
+    :param solution: Complete solution containing plans for each agent
+    :returns: An int64 array, agents in the order of solution.keys()
+    """
+    max_t = max(len(path) for path in solution.values())
+    matrix = np.empty((len(solution), max_t, 2), dtype=np.int64)
+    for row, path in enumerate(solution.values()):
+        matrix[row, :len(path)] = [(state.position.x, state.position.y)
+                                   for state in path]
+        matrix[row, len(path):] = matrix[row, len(path) - 1]
+    return matrix
+
+
+def _colliding_pairs(
+        keys: np.ndarray):
+    """
+    Groups equal keys of a flat array
+
+    :returns: An iterator over the index arrays of the groups holding more
+                than one key, each sorted by index
+    """
+    order = np.argsort(keys, kind='stable')
+    sorted_keys = keys[order]
+    duplicate = sorted_keys[1:] == sorted_keys[:-1]
+    if not duplicate.any():
+        return
+    # Start and end of the runs of equal keys
+    starts = np.flatnonzero(~np.concatenate(([False], duplicate)))
+    ends = np.append(starts[1:], len(keys))
+    for start, end in zip(starts[ends - starts > 1], ends[ends - starts > 1]):
+        yield order[start:end]
+
+
+def find_conflicts(
+        solution: dict,
+        first_only: bool = False) -> list:
+    """
+    Vectorized equivalent of Environment.iter_conflicts. Vertex collisions
+    are found by grouping equal (time, cell) keys and edge swaps by grouping
+    equal (time, unordered edge) keys over the whole path matrix at once, so
+    the Python work is proportional to the number of conflicts rather than
+    to time x agents squared.
+
+    :param solution: Complete solution containing plans for each agent
+    :param first_only: Only return the conflict Environment.get_first_conflict
+                        would
+    :returns: A list of Conflict objects, in the order of iter_conflicts
+    """
+    agents = list(solution.keys())
+    matrix = build_path_matrix(solution)
+    num_agents, max_t, _ = matrix.shape
+    width = int(matrix[..., 1].max()) + 1
+    num_cells = (int(matrix[..., 0].max()) + 1) * width
+    cells = matrix[..., 0] * width + matrix[..., 1]
+    times = np.broadcast_to(np.arange(max_t), cells.shape)
+
+    # (time, conflict type, agent index 1, agent index 2)
+    found = []
+
+    vertex_keys = (times * num_cells + cells).ravel()
+    for group in _colliding_pairs(vertex_keys):
+        t = int(group[0] % max_t)
+        members = np.sort(group // max_t)
+        for a, i in enumerate(members):
+            for j in members[a + 1:]:
+                found.append((t, Conflict.VERTEX, int(i), int(j)))
+
+    if max_t > 1:
+        # Moves from t to t + 1, the last time step moves onto itself
+        cells_from = cells
+        cells_to = np.concatenate((cells[:, 1:], cells[:, -1:]), axis=1)
+        low = np.minimum(cells_from, cells_to)
+        high = np.maximum(cells_from, cells_to)
+        edge_keys = ((times * num_cells + low) * num_cells + high).ravel()
+        forward = (cells_from <= cells_to).ravel()
+        for group in _colliding_pairs(edge_keys):
+            t = int(group[0] % max_t)
+            members = np.sort(group)
+            for a, i in enumerate(members):
+                for j in members[a + 1:]:
+                    # Same edge in opposite directions. Agents staying on
+                    # the same cell share a key too, but both count as
+                    # moving forward.
+                    if forward[i] != forward[j]:
+                        found.append((t, Conflict.EDGE, int(i // max_t),
+                                      int(j // max_t)))
+
+    found.sort()
+    if first_only:
+        found = found[:1]
+
+    conflicts = []
+    for t, conflict_type, i, j in found:
+        path_1 = solution[agents[i]]
+        result = Conflict()
+        result.time = t
+        result.conflict_type = conflict_type
+        result.agent_1 = agents[i]
+        result.agent_2 = agents[j]
+        result.position_1 = path_1[min(t, len(path_1) - 1)].position
+        if conflict_type == Conflict.EDGE:
+            result.position_2 = path_1[min(t + 1, len(path_1) - 1)].position
+        conflicts.append(result)
+    return conflicts
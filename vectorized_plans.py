@@ -0,0 +1,214 @@
+from __future__ import annotations
+from itertools import chain
+from operator import itemgetter
+
+import numpy as np
+
+# Actions of pogema, named as in main.extract_moves_from_solution: LEFT and
+# RIGHT change x, DOWN and UP change y
+WAIT = 0
+LEFT = 1
+RIGHT = 2
+DOWN = 3
+UP = 4
+
+# Action of the move (dx, dy) at (dx + 1) * 3 + dy + 1, -1 for the diagonal
+# moves
+_MOVE_ACTIONS = np.array([-1, LEFT, -1, DOWN, WAIT, UP, -1, RIGHT, -1],
+                         dtype=np.int8)
+
+# Kinds of violations found by validate_plan
+MISSING_AGENT = 'missing_agent'
+UNKNOWN_AGENT = 'unknown_agent'
+WRONG_TIME = 'wrong_time'
+WRONG_START = 'wrong_start'
+WRONG_GOAL = 'wrong_goal'
+OUT_OF_BOUNDS = 'out_of_bounds'
+OBSTACLE = 'obstacle'
+INVALID_MOVE = 'invalid_move'
+VERTEX_COLLISION = 'vertex_collision'
+EDGE_COLLISION = 'edge_collision'
+
+
+def _flatten(
+        plan: dict,
+        field: int) -> tuple:
+    """
+    :param field: 0 for the times of the paths, 1 for their positions
+    :returns: (the field of all states of the plan, path after path, in one
+                int64 array, the lengths of the paths)
+    """
+    lengths = np.array([len(path) for path in plan.values()], dtype=np.int64)
+    # Reading the tuples dominates the cost, so they are read in one pass at
+    # C speed
+    states = map(itemgetter(field), chain.from_iterable(plan.values()))
+    if field == 0:
+        return np.fromiter(states, dtype=np.int64,
+                           count=lengths.sum()), lengths
+    flat = np.fromiter(chain.from_iterable(states), dtype=np.int64,
+                       count=2 * lengths.sum())
+    return flat.reshape(-1, 2), lengths
+
+
+def plan_to_positions(
+        plan: dict) -> np.ndarray:
+    """
+    Stacks the paths of a plan into an (agents x time x 2) array of (x, y)
+    positions. Paths shorter than the longest one are padded with their last
+    position, as agents stay at their goal.
+
+    :param plan: The plan, see CBS.generate_plan
+    :returns: An int64 array, agents in the order of plan.keys()
+    """
+    flat, lengths = _flatten(plan, 1)
+    max_t = int(lengths.max()) if len(lengths) else 0
+    starts = np.cumsum(lengths) - lengths
+    index = starts[:, None] + np.minimum(np.arange(max_t),
+                                         lengths[:, None] - 1)
+    return flat[index]
+
+
+def plan_to_actions(
+        plan: dict) -> np.ndarray:
+    """
+    Vectorized equivalent of main.extract_moves_from_solution: the action of
+    every agent at every time step, WAIT once an agent has reached its goal
+
+    :param plan: The plan, see CBS.generate_plan
+    :returns: A (time steps x agents) int8 array, agents in the order of
+                plan.keys()
+    :raises ValueError: If a step of the plan is not a unit move
+    """
+    if not plan:
+        return np.zeros((0, 0), dtype=np.int8)
+    moves = np.diff(plan_to_positions(plan), axis=1)
+    if (np.abs(moves) > 1).any():
+        raise ValueError("Wrong Move detected!")
+    actions = _MOVE_ACTIONS[(moves[..., 0] + 1) * 3 + moves[..., 1] + 1]
+    if (actions < 0).any():
+        raise ValueError("Wrong Move detected!")
+    return actions.T
+
+
+def _grouped_agents(
+        keys: np.ndarray) -> list:
+    """
+    :param keys: An (agents x time) array
+    :returns: (agent indices, time) of each key held by more than one agent,
+                the indices sorted
+    """
+    flat = keys.ravel()
+    values, counts = np.unique(flat, return_counts=True)
+    shared = values[counts > 1]
+    if not len(shared):
+        return []
+    indices = np.flatnonzero(np.isin(flat, shared))
+    order = np.argsort(flat[indices], kind='stable')
+    indices = indices[order]
+    groups = np.split(indices, np.flatnonzero(np.diff(flat[indices])) + 1)
+    max_t = keys.shape[1]
+    return [(np.sort(group // max_t), int(group[0] % max_t))
+            for group in groups]
+
+
+def validate_plan(
+        plan: dict,
+        env_dict: dict) -> list:
+    """
+    Checks a whole plan against its instance in one pass over the array of
+    its positions, independently of the solvers:
+    - the plan has a non-empty path for every agent of the instance and no
+      path for other agents, which are not checked further
+    - the paths are timed 0, 1, 2, ... and lead from the agents' starts to
+      their goals
+    - every position is inside the grid and not an obstacle
+    - every step is a wait or a move to an adjacent cell
+    - no two agents are at the same cell at the same time, agents staying
+      at their goals included, nor swap cells in one step
+
+    :param plan: The plan, see CBS.generate_plan
+    :param env_dict: The instance, as consumed by the Environment class
+    :returns: A list of (kind, time, agent, other agent) violations, other
+                agent None for the single agent ones, [] for a valid plan.
+                A wrong time is reported at the first position of the path
+                whose time is wrong.
+    """
+    agent_dict = {agent['name']: agent for agent in env_dict['agents']}
+    violations = [(MISSING_AGENT, 0, agent, None) for agent in agent_dict
+                  if not plan.get(agent)]
+    violations += [(UNKNOWN_AGENT, 0, agent, None) for agent in plan
+                   if agent not in agent_dict]
+    plan = {agent: path for agent, path in plan.items()
+            if agent in agent_dict and path}
+    agents = list(plan.keys())
+    if not agents:
+        return violations
+
+    times, lengths = _flatten(plan, 0)
+    first = np.cumsum(lengths) - lengths
+    wrong = np.flatnonzero(times != np.arange(len(times)) -
+                           np.repeat(first, lengths))
+    # wrong is sorted, so the first wrong state of each agent comes first
+    wrong_agents, index = np.unique(
+        np.searchsorted(first, wrong, side='right') - 1, return_index=True)
+    for i, w in zip(wrong_agents, wrong[index]):
+        violations.append((WRONG_TIME, int(w - first[i]), agents[i], None))
+
+    positions = plan_to_positions(plan)
+    expected = np.array([(agent_dict[agent]['start'], agent_dict[agent]['goal'])
+                         for agent in agents], dtype=np.int64)
+    for i in np.flatnonzero((positions[:, 0] != expected[:, 0]).any(axis=1)):
+        violations.append((WRONG_START, 0, agents[i], None))
+    last = positions[np.arange(len(agents)), lengths - 1]
+    for i in np.flatnonzero((last != expected[:, 1]).any(axis=1)):
+        violations.append((WRONG_GOAL, int(lengths[i]) - 1, agents[i], None))
+
+    rows, columns = env_dict['dimensions']
+    x, y = positions[..., 0], positions[..., 1]
+    inside = (x >= 0) & (x < rows) & (y >= 0) & (y < columns)
+    for i, t in zip(*np.nonzero(~inside)):
+        violations.append((OUT_OF_BOUNDS, int(t), agents[i], None))
+
+    grid = np.zeros((rows, columns), dtype=bool)
+    if len(env_dict['obstacles']):
+        obstacles = np.asarray(env_dict['obstacles'], dtype=np.int64)
+        grid[obstacles[:, 0], obstacles[:, 1]] = True
+    x = np.clip(x, 0, rows - 1)
+    y = np.clip(y, 0, columns - 1)
+    for i, t in zip(*np.nonzero(grid[x, y] & inside)):
+        violations.append((OBSTACLE, int(t), agents[i], None))
+
+    moves = np.abs(np.diff(positions, axis=1)).sum(axis=2)
+    for i, t in zip(*np.nonzero(moves > 1)):
+        violations.append((INVALID_MOVE, int(t), agents[i], None))
+
+    num_cells = rows * columns
+    max_t = positions.shape[1]
+    cells = x * columns + y
+    times = np.arange(max_t)
+    for group, t in _grouped_agents(times * num_cells + cells):
+        for a, i in enumerate(group):
+            for j in group[a + 1:]:
+                violations.append((VERTEX_COLLISION, t, agents[i],
+                                   agents[j]))
+
+    if max_t > 1:
+        # A swap is a move whose reverse is made by another agent at the
+        # same time
+        cells_from, cells_to = cells[:, :-1], cells[:, 1:]
+        step_times = times[:-1]
+        forward = (step_times * num_cells + cells_from) * num_cells + cells_to
+        reverse = (step_times * num_cells + cells_to) * num_cells + cells_from
+        moving = cells_from != cells_to
+        swapped = moving & np.isin(forward, reverse[moving])
+        movers = {}
+        for i, t in zip(*np.nonzero(swapped)):
+            movers.setdefault(int(forward[i, t]), []).append(i)
+        for i, t in zip(*np.nonzero(swapped)):
+            for j in movers.get(int(reverse[i, t]), ()):
+                if i < j:
+                    violations.append((EDGE_COLLISION, int(t), agents[i],
+                                       agents[j]))
+
+    violations.sort(key=lambda violation: violation[1])
+    return violations
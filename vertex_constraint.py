@@ -1,5 +1,5 @@
 from __future__ import annotations
-from position import Position
+from position import Position, COORDINATE_BITS
 
 
 class VertexConstraint:
@@ -7,6 +7,8 @@ class VertexConstraint:
     A vertex constraint is constraint which defines a vertex to be added in the
     top-level CBS tree.
     """
+    __slots__ = ('time', 'position')
+
     def __init__(
             self,
             time: int,
@@ -17,12 +19,15 @@ class VertexConstraint:
     def __eq__(
             self,
             other: VertexConstraint) -> bool:
+        if not isinstance(other, VertexConstraint):
+            return NotImplemented
         return self.time == other.time and self.position == other.position
 
     def __hash__(
             self) -> hash:
-        """Added to make this class hashable"""
-        return hash(str(self.time)+str(self.position.x) + str(self.position.y))
+        """Packs (time, x, y) into a single integer, like State"""
+        return (((self.time << COORDINATE_BITS) | self.position.x)
+                << COORDINATE_BITS) | self.position.y
 
     def __str__(
             self) -> str:
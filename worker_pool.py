@@ -0,0 +1,87 @@
+from __future__ import annotations
+from concurrent.futures import ProcessPoolExecutor
+from a_star import AStar
+from state import State
+
+# The Environment of a worker process, built once when the worker starts
+_worker_environment = None
+
+
+def _initialize_worker(
+        env_dict: dict,
+        time_horizon: int,
+        max_expansions: int) -> None:
+    # Imported here, environment.py imports the CBS stack
+    from environment import Environment
+    global _worker_environment
+    _worker_environment = Environment(env_dict, AStar.LARGER_G, time_horizon,
+                                      max_expansions)
+
+
+def _plan_agent(
+        task: tuple) -> list:
+    """
+    Runs the low-level search of one agent in a worker
+
+    :param task: (agent, Constraints of the agent)
+    :returns: The cell indices of the path, None if there is none
+    """
+    agent, constraints = task
+    environment = _worker_environment
+    environment.constraint_dict = {agent: constraints}
+    path = environment.compute_agent_solution(agent, {})
+    if not path:
+        return None
+    return [environment.cell_index(state.position) for state in path]
+
+
+class WorkerPool:
+    """
+    Runs low-level searches in a pool of worker processes. Each worker
+    builds its own Environment from the map and agents once, when it starts,
+    so a task only carries an agent and its constraints, and a result the
+    cells of a path.
+
+    The workers plan without a conflict avoidance table, so only the
+    LARGER_G tie-breaking rule is supported. Low-level expansions made in
+    the workers are not counted in the environment's AStar.
+
+    Every task pickles the agent's whole Constraints and every path is sent
+    back, so a pool only pays off when the low-level searches cost far more
+    than that, i.e. on large maps with long paths, and on as many cores as
+    workers. On small instances, or on a single core, a pool is slower than
+    planning in the CBS process.
+    """
+    def __init__(
+            self,
+            environment,
+            num_workers: int) -> None:
+        """
+        :param environment: The Environment the searches run in
+        :param num_workers: Number of worker processes
+        """
+        if type(environment.a_star) is not AStar or \
+                environment.a_star.tie_breaking != AStar.LARGER_G:
+            raise ValueError("Worker processes only run the AStar search "
+                             "with the " + AStar.LARGER_G + " tie-breaking")
+        self.cell_positions = environment.cell_positions
+        self.executor = ProcessPoolExecutor(
+            num_workers, initializer=_initialize_worker,
+            initargs=(environment.to_env_dict(), environment.time_horizon,
+                      environment.a_star.max_expansions))
+
+    def plan(
+            self,
+            tasks: list) -> list:
+        """
+        :param tasks: (agent, Constraints of the agent) pairs
+        :returns: The path of each task, in the order of the tasks, False
+                    where there is none
+        """
+        positions = self.cell_positions
+        return [[State(t, positions[cell]) for t, cell in enumerate(cells)]
+                if cells is not None else False
+                for cells in self.executor.map(_plan_agent, tasks)]
+
+    def shutdown(self) -> None:
+        self.executor.shutdown()